@@ -1,6 +1,13 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import Annotated, Literal
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.config import Config
+
+# Article ids are Postgres integers: larger ones can't name an article, and would fail to bind as parameters
+ARTICLE_ID_MAX = 2**31 - 1
+ArticleId = Annotated[int, Field(ge=1, le=ARTICLE_ID_MAX)]
 
 
 class ArticleUpdateLastAccessed(BaseModel):
@@ -12,6 +19,27 @@ class ArticleMarkRead(BaseModel):
     read: bool
 
 
+class ArticleFilter(BaseModel):
+    # Same meaning as the query parameters of GET /articles/all
+    host: str | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+
+
+class ArticleBulkMarkRead(BaseModel):
+    """Exactly one of `ids` or `filter`; an empty filter selects all of the user's articles."""
+
+    read: bool
+    ids: list[ArticleId] | None = Field(None, max_length=Config.Articles.BULK_READ_MAX_IDS)
+    filter: ArticleFilter | None = None
+
+
+class ArticleBulkMarkReadResult(BaseModel):
+    # Articles whose read state changed; those already in the requested state are left alone
+    updated: int
+    ids: list[int]
+
+
 class ArticleResponse(BaseModel):
     id: int
     url: str
@@ -20,3 +48,91 @@ class ArticleResponse(BaseModel):
     date_read: datetime | None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ArticleChanges(BaseModel):
+    # Oldest change first
+    articles: list[ArticleResponse]
+    # Pass back as `cursor` for the changes after these; unchanged when there were none
+    cursor: str
+    has_more: bool
+
+
+class ArticleAccessBatchRequest(BaseModel):
+    items: list[ArticleUpdateLastAccessed] = Field(..., max_length=Config.Articles.ACCESS_BATCH_MAX_ITEMS)
+
+
+class ArticleAccessBatchResult(BaseModel):
+    url: str
+    status_code: int
+    detail: str | None = None
+    article: ArticleResponse | None = None
+
+
+class ArticleLookupRequest(BaseModel):
+    urls: list[str] = Field(..., max_length=Config.Articles.LOOKUP_MAX_URLS)
+
+
+class ArticleReadState(BaseModel):
+    id: int
+    date_read: datetime | None
+
+
+class ArticleActivity(BaseModel):
+    day: date
+    host: str
+    accesses: int
+    revisits: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DailyReads(BaseModel):
+    day: date
+    reads: int
+
+
+class WeeklyReads(BaseModel):
+    # Monday of the week
+    week: date
+    reads: int
+
+
+class SiteStats(BaseModel):
+    site: str
+    articles: int
+    read: int
+
+
+class ArticleStats(BaseModel):
+    reads_per_day: list[DailyReads]
+    reads_per_week: list[WeeklyReads]
+    sites: list[SiteStats]
+    # Consecutive UTC days with at least one read; the current streak is still alive if it ended yesterday
+    current_streak: int
+    longest_streak: int
+    median_seconds_to_read: float | None
+
+
+class ArticleEvent(BaseModel):
+    # Client-generated idempotency key, unique per user
+    id: str = Field(..., min_length=1, max_length=128)
+    type: Literal["access", "read", "unread"]
+    url: str
+    # Client clock; naive timestamps are taken as UTC
+    occurred_at: datetime
+    create_if_not_exist: bool = False
+
+
+class ArticleEventBatch(BaseModel):
+    events: list[ArticleEvent] = Field(..., max_length=Config.Articles.EVENTS_MAX_ITEMS)
+
+
+# stale: a newer read state had already been recorded; duplicate: the id was already applied
+ArticleEventStatus = Literal["applied", "stale", "duplicate", "unsupported", "not_found"]
+
+
+class ArticleEventResult(BaseModel):
+    id: str
+    status: ArticleEventStatus
+    article: ArticleResponse | None = None
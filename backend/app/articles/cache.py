@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from app.config import Config
+
+
+class CacheBackend(Protocol):
+    """Storage behind `ReadStateCache`.
+
+    The default is an in-process LRU. A shared store (e.g. Redis) can be plugged in through
+    `ReadStateCache.set_backend` so that every worker sees the same entries and invalidations.
+    """
+
+    def get(self, key: str) -> Any | None: ...
+
+    def set(self, key: str, value: Any, ttl: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class LRUCacheBackend:
+    """Bounded in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ReadStateCache:
+    """Caches the articles a user has for a URL, keyed by (user_id, url).
+
+    Writes to an article go through `set` (or `invalidate`) after they commit, so reads never see a state
+    older than the last write made through this service.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(user_id: str, url: str) -> str:
+        return f"read-state:{user_id}:{url}"
+
+    def get(self, user_id: str, url: str) -> list[dict[str, Any]] | None:
+        articles = self.backend.get(self._key(user_id, url))
+        if articles is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return articles
+
+    def set(self, user_id: str, url: str, articles: list[dict[str, Any]]) -> None:
+        self.backend.set(self._key(user_id, url), articles, self.ttl)
+
+    def invalidate(self, user_id: str, url: str) -> None:
+        self.backend.delete(self._key(user_id, url))
+
+    def set_backend(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+read_state_cache = ReadStateCache(
+    LRUCacheBackend(Config.Articles.READ_CACHE_MAX_ENTRIES), Config.Articles.READ_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,138 @@
+"""Compact encodings of article lists, picked by the Accept header.
+
+JSON (the default) is a list of objects, one per article. The columnar layout instead has one array per
+field, and splits every URL into an index into a table of distinct prefixes (scheme and host) plus the rest
+of the URL, so neither keys nor hosts are repeated per article:
+
+    {
+        "id": [1, 2],
+        "url_prefix": [0, 0],
+        "url_suffix": ["2024/08/21/a", "2024/08/22/b"],
+        "date_first_accessed": [...],
+        "date_last_accessed": [...],
+        "date_read": [...],
+        "prefixes": ["https://www.economist.com/"]
+    }
+
+It is served as JSON (`application/vnd.articles.columnar+json`) or MessagePack (`application/msgpack`),
+where dates are MessagePack timestamps instead of ISO 8601 strings.
+"""
+
+from datetime import UTC, datetime
+from typing import Any, Iterable, Mapping, Sequence
+
+import msgpack  # type: ignore[import-untyped]
+import orjson
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.articles.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Also accepted in Accept headers, for clients that still use the unregistered name
+MEDIA_TYPE_ALIASES = {"application/x-msgpack": MSGPACK_MEDIA_TYPE}
+
+MEDIA_TYPES = (JSON_MEDIA_TYPE, COLUMNAR_JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE)
+
+DATE_FIELDS = ("date_first_accessed", "date_last_accessed", "date_read")
+
+
+def negotiate(accept: str | None) -> str:
+    """The supported media type the Accept header prefers, JSON when it names none of them.
+
+    Quality values are honoured; between equally preferred types, the one listed first wins. Wildcards
+    select JSON, so browsers and clients that don't ask for anything in particular get what they always have.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    best, best_quality = JSON_MEDIA_TYPE, 0.0
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        media_type = MEDIA_TYPE_ALIASES.get(media_type.lower(), media_type.lower())
+        if media_type in ("*/*", "application/*"):
+            media_type = JSON_MEDIA_TYPE
+        if media_type not in MEDIA_TYPES:
+            continue
+
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def _split_url(url: str) -> tuple[str, str]:
+    # Everything up to and including the slash after the host: "https://www.economist.com/"
+    scheme_end = url.find("://")
+    path_start = url.find("/", scheme_end + 3) if scheme_end >= 0 else -1
+    if path_start < 0:
+        return url, ""
+    return url[: path_start + 1], url[path_start + 1 :]
+
+
+def to_columns(articles: Iterable[Mapping[str, Any]]) -> dict[str, list[Any]]:
+    """Lay out articles (ArticleResponse fields) as one array per field, with dictionary-encoded URLs."""
+    prefixes: dict[str, int] = {}
+    columns: dict[str, list[Any]] = {
+        "id": [],
+        "url_prefix": [],
+        "url_suffix": [],
+        **{field: [] for field in DATE_FIELDS},
+    }
+    for article in articles:
+        prefix, suffix = _split_url(article["url"])
+        columns["id"].append(article["id"])
+        columns["url_prefix"].append(prefixes.setdefault(prefix, len(prefixes)))
+        columns["url_suffix"].append(suffix)
+        for field in DATE_FIELDS:
+            columns[field].append(article[field])
+    columns["prefixes"] = list(prefixes)
+    return columns
+
+
+def from_columns(columns: Mapping[str, list[Any]]) -> list[dict[str, Any]]:
+    """The inverse of `to_columns`, as a client would decode it."""
+    prefixes = columns["prefixes"]
+    return [
+        {
+            "id": article_id,
+            "url": prefixes[prefix] + suffix,
+            **{field: columns[field][index] for field in DATE_FIELDS},
+        }
+        for index, (article_id, prefix, suffix) in enumerate(
+            zip(columns["id"], columns["url_prefix"], columns["url_suffix"])
+        )
+    ]
+
+
+def _json_default(value: Any) -> Any:
+    # orjson only encodes datetime itself natively, not subclasses (e.g. pendulum's, or freezegun's)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # Stored as naive UTC
+        return msgpack.Timestamp.from_datetime(value if value.tzinfo else value.replace(tzinfo=UTC))
+    raise TypeError(f"Type is not MessagePack serializable: {type(value).__name__}")
+
+
+def encode_json(content: Any) -> bytes:
+    return orjson.dumps(content, default=_json_default)
+
+
+def encode_articles(articles: Sequence[Mapping[str, Any]], media_type: str) -> bytes:
+    """Encode articles (ArticleResponse fields) in one of MEDIA_TYPES."""
+    if media_type == COLUMNAR_JSON_MEDIA_TYPE:
+        return encode_json(to_columns(articles))
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(to_columns(articles), default=_msgpack_default, datetime=False)
+    return encode_json(articles)
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from collections import deque
+from contextlib import suppress
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import Config
+from app.models import ArticleAccessEvent
+
+logger = logging.getLogger(__name__)
+
+events_table = ArticleAccessEvent.__table__
+
+
+class AccessEventLog:
+    """Buffer of article visits for the access history table.
+
+    Requests only append to memory; `run` inserts the buffer in multi-row batches every `flush_seconds`, or
+    as soon as `batch_size` visits are waiting. History is best effort: visits still buffered when a worker
+    dies are lost, and while the database is unreachable at most `max_buffered` of the newest are kept.
+    """
+
+    def __init__(self, flush_seconds: float, batch_size: int, max_buffered: int):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+        self._events: deque[dict] = deque(maxlen=max_buffered)
+        # Created by `run`, so it belongs to the loop the flusher runs on
+        self._batch_ready: asyncio.Event | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_seconds > 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def record(self, user_id: str, article_id: int, accessed_at: datetime) -> None:
+        if not self.enabled:
+            return
+        self._events.append({"user_id": user_id, "article_id": article_id, "accessed_at": accessed_at})
+        if self._batch_ready and len(self._events) >= self.batch_size:
+            self._batch_ready.set()
+
+    def clear(self) -> None:
+        self._events.clear()
+
+    async def flush(self, session_factory: async_sessionmaker) -> int:
+        """Insert buffered visits and return how many were written."""
+        if self._batch_ready:
+            self._batch_ready.clear()
+        events = list(self._events)
+        self._events.clear()
+        if not events:
+            return 0
+
+        try:
+            async with session_factory() as db:
+                for start in range(0, len(events), self.batch_size):
+                    await db.execute(insert(events_table), events[start : start + self.batch_size])
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to write %d article access events", len(events))
+            # Requeue ahead of anything recorded meanwhile, dropping the oldest on overflow
+            self._events = deque([*events, *self._events], maxlen=self.max_buffered)
+            raise
+        return len(events)
+
+    async def run(self, session_factory: async_sessionmaker) -> None:
+        self._batch_ready = batch_ready = asyncio.Event()
+        while True:
+            with suppress(TimeoutError):
+                await asyncio.wait_for(batch_ready.wait(), timeout=self.flush_seconds)
+            try:
+                await self.flush(session_factory)
+            except Exception:
+                # Already logged and requeued; try again next interval
+                await asyncio.sleep(self.flush_seconds)
+
+
+access_event_log = AccessEventLog(
+    Config.Articles.ACCESS_EVENTS_FLUSH_SECONDS,
+    Config.Articles.ACCESS_EVENTS_BATCH_SIZE,
+    Config.Articles.ACCESS_EVENTS_BUFFER_MAX,
+)
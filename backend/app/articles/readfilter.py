@@ -0,0 +1,120 @@
+import math
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.models import Article
+
+from .cache import LRUCacheBackend
+
+UINT64_MASK = (1 << 64) - 1
+# Room for reads made after a filter is built, before it has to be resized
+CAPACITY_HEADROOM = 1.5
+MIN_CAPACITY = 64
+# Bits can't be cleared, so articles marked unread stay in the filter as false positives until the next
+# rebuild; this bounds how many of them a filter may carry, as a share of its capacity.
+MAX_REMOVED_SHARE = 0.1
+
+
+class BloomFilter:
+    """Bloom filter over article url hashes (see app.articles.urls.url_hash).
+
+    Bit `i` of the filter is bit `i % 8` of byte `i // 8`. A key's positions use double hashing on its
+    unsigned 64-bit value: h1 is the low 32 bits, h2 the high 32 bits, and position j (0 <= j < hashes) is
+    (h1 + j * h2) mod bits.
+    """
+
+    def __init__(self, bits: int, hashes: int):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float) -> "BloomFilter":
+        bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        bits = max(8, (bits + 7) // 8 * 8)
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        return cls(bits, hashes)
+
+    def _positions(self, key: int) -> list[int]:
+        key &= UINT64_MASK
+        h1, h2 = key & 0xFFFFFFFF, key >> 32
+        return [(h1 + j * h2) % self.bits for j in range(self.hashes)]
+
+    def add(self, key: int) -> None:
+        for position in self._positions(key):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: int) -> bool:
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+@dataclass
+class ReadFilter:
+    """A user's read filter as of their articles `version`."""
+
+    bloom: BloomFilter
+    version: int
+    capacity: int
+    items: int = 0
+    removed: int = 0
+
+
+async def _build(db: AsyncSession, user_id: str, version: int, read_count: int) -> ReadFilter:
+    capacity = max(MIN_CAPACITY, math.ceil(read_count * CAPACITY_HEADROOM))
+    read_filter = ReadFilter(
+        BloomFilter.for_capacity(capacity, Config.Articles.READ_FILTER_FALSE_POSITIVE_RATE), version, capacity
+    )
+    hashes = await db.scalars(
+        select(Article.url_hash).where(Article.user_id == user_id, Article.date_read.is_not(None))
+    )
+    for key in hashes:
+        read_filter.bloom.add(key)
+        read_filter.items += 1
+    return read_filter
+
+
+async def _catch_up(db: AsyncSession, user_id: str, read_filter: ReadFilter, version: int) -> bool:
+    """Apply the rows changed since the filter was built; False if it needs rebuilding instead."""
+    rows = await db.execute(
+        select(Article.url_hash, Article.date_read.is_not(None), Article.read_state_at.is_not(None)).where(
+            Article.user_id == user_id, Article.change_version > read_filter.version
+        )
+    )
+    for key, is_read, read_state_changed in rows:
+        if is_read:
+            if key not in read_filter.bloom:
+                read_filter.bloom.add(key)
+                read_filter.items += 1
+        elif read_state_changed and key in read_filter.bloom:
+            # Marked unread, or a false positive all along: either way it can't be taken out
+            read_filter.removed += 1
+    read_filter.version = version
+    return read_filter.items <= read_filter.capacity and read_filter.removed <= read_filter.capacity * MAX_REMOVED_SHARE
+
+
+class ReadFilterCache:
+    """Per-user read filters, built once and then caught up incrementally from article change versions."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.backend = LRUCacheBackend(max_entries)
+        self.ttl = ttl
+
+    async def get(self, db: AsyncSession, user_id: str, version: int, read_count: int) -> ReadFilter:
+        read_filter = self.backend.get(user_id)
+        if read_filter is not None and read_filter.version == version:
+            return read_filter
+        if read_filter is None or not await _catch_up(db, user_id, read_filter, version):
+            read_filter = await _build(db, user_id, version, read_count)
+        self.backend.set(user_id, read_filter, self.ttl)
+        return read_filter
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+read_filter_cache = ReadFilterCache(
+    Config.Articles.READ_FILTER_CACHE_MAX_ENTRIES, Config.Articles.READ_FILTER_CACHE_TTL_SECONDS
+)
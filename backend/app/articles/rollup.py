@@ -0,0 +1,147 @@
+"""Compact raw article visits into daily per-user, per-host buckets and prune old visits.
+
+    python -m app.articles.rollup [--retention-days N]
+
+Run it periodically (e.g. hourly from cron). Each run recomputes the buckets from the day before the newest
+bucket onwards, so it is idempotent and picks up visits that were flushed late. Visits for earlier days
+(e.g. offline backlogs) are found by id, past the last id the previous run counted, and added to their
+buckets. Raw visits are deleted once they are past the retention window and have been rolled up. Expired
+idempotency keys of POST /articles/events are pruned as well.
+"""
+
+import argparse
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta
+
+from sqlalchemy import Date, cast, delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.config import Config
+from app.db import SessionLocal
+from app.models import (
+    Article,
+    ArticleAccessDaily,
+    ArticleAccessEvent,
+    ArticleAccessRollupState,
+    ArticleEventReceipt,
+)
+
+# Serializes concurrent runs (pg_advisory_xact_lock key)
+ROLLUP_LOCK_ID = 0x65636F6D656D6F  # "ecomemo"
+
+
+@dataclass
+class RollupResult:
+    since: date | None
+    buckets: int
+    pruned: int
+
+
+def _bucket_select(*conditions):
+    day = cast(ArticleAccessEvent.accessed_at, Date)
+    # Canonical URLs all look like https://<host>/...
+    host = func.split_part(Article.url, "/", 3)
+    return (
+        select(
+            ArticleAccessEvent.user_id,
+            day,
+            host,
+            func.count(),
+            func.count().filter(ArticleAccessEvent.accessed_at > Article.date_first_accessed),
+        )
+        .join(Article, Article.id == ArticleAccessEvent.article_id)
+        .where(*conditions)
+        .group_by(ArticleAccessEvent.user_id, day, host)
+    )
+
+
+def rollup_access_events(db: Session, now: datetime | None = None, retention_days: int | None = None) -> RollupResult:
+    """Rebuild the daily buckets for recent days, add older visits that arrived since the last run, and
+    prune raw visits past retention. The caller commits."""
+    now = now or datetime.now(UTC)
+    retention_days = Config.Articles.ACCESS_EVENTS_RETENTION_DAYS if retention_days is None else retention_days
+
+    db.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_ID)))
+
+    # Visits up to this id are counted by this run; later ones are left to the next
+    newest_id, oldest = db.execute(
+        select(func.max(ArticleAccessEvent.id), func.min(ArticleAccessEvent.accessed_at))
+    ).one()
+    if newest_id is None:
+        return RollupResult(since=None, buckets=0, pruned=0)
+    last_event_id = db.scalar(select(ArticleAccessRollupState.last_event_id).where(ArticleAccessRollupState.id == 1))
+
+    latest = db.scalar(select(func.max(ArticleAccessDaily.day)))
+    if latest is not None:
+        since = latest - timedelta(days=1)
+    else:
+        since = oldest.date()
+    since_at = datetime.combine(since, time.min)
+    counted = ArticleAccessEvent.id <= newest_id
+
+    db.execute(delete(ArticleAccessDaily).where(ArticleAccessDaily.day >= since))
+    buckets = db.execute(
+        insert(ArticleAccessDaily).from_select(
+            ["user_id", "day", "host", "accesses", "revisits"],
+            _bucket_select(ArticleAccessEvent.accessed_at >= since_at, counted),
+        )
+    ).rowcount
+
+    # Visits for earlier days that arrived since the last run, such as offline backlogs replayed through
+    # POST /articles/events. Their raw visits may be partly pruned already, so they are added to the buckets
+    # rather than rebuilt.
+    if last_event_id is not None:
+        stmt = pg_insert(ArticleAccessDaily).from_select(
+            ["user_id", "day", "host", "accesses", "revisits"],
+            _bucket_select(ArticleAccessEvent.accessed_at < since_at, ArticleAccessEvent.id > last_event_id, counted),
+        )
+        buckets += db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["user_id", "day", "host"],
+                set_={
+                    "accesses": ArticleAccessDaily.accesses + stmt.excluded.accesses,
+                    "revisits": ArticleAccessDaily.revisits + stmt.excluded.revisits,
+                },
+            )
+        ).rowcount
+
+    db.execute(
+        pg_insert(ArticleAccessRollupState)
+        .values(id=1, last_event_id=newest_id)
+        .on_conflict_do_update(index_elements=["id"], set_={"last_event_id": newest_id})
+    )
+
+    # Never prune visits that haven't been rolled up yet, whatever the retention
+    prune_before = min(now.replace(tzinfo=None) - timedelta(days=retention_days), since_at)
+    pruned = db.execute(
+        delete(ArticleAccessEvent).where(ArticleAccessEvent.accessed_at < prune_before, counted)
+    ).rowcount
+
+    return RollupResult(since=since, buckets=buckets, pruned=pruned)
+
+
+def prune_event_receipts(db: Session, now: datetime | None = None, retention_days: int | None = None) -> int:
+    """Forget idempotency keys older than the retention window. The caller commits."""
+    now = now or datetime.now(UTC)
+    retention_days = Config.Articles.EVENT_RECEIPTS_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = now.replace(tzinfo=None) - timedelta(days=retention_days)
+    return db.execute(delete(ArticleEventReceipt).where(ArticleEventReceipt.received_at < cutoff)).rowcount
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--retention-days", type=int, default=Config.Articles.ACCESS_EVENTS_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        result = rollup_access_events(db, retention_days=args.retention_days)
+        receipts = prune_event_receipts(db)
+        db.commit()
+
+    print(f"Rolled up visits since {result.since}: {result.buckets} bucket(s), {result.pruned} visit(s) pruned")
+    print(f"Pruned {receipts} expired event id(s)")
+
+
+if __name__ == "__main__":
+    main()
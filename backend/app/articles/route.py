@@ -1,70 +1,588 @@
-from datetime import UTC, datetime
+import base64
+import csv
+import hashlib
+import io
+from dataclasses import asdict
+from datetime import UTC, date, datetime, timedelta
+from typing import Any, AsyncIterator, Literal
+from urllib.parse import urlsplit
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Query
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import BigInteger, Boolean, any_, bindparam, false, literal, literal_column, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import ReturningInsert, ReturningUpdate
+from sqlalchemy.sql.elements import ColumnElement
 
 from app.config import Config
-from app.db import get_db
-from app.models import Article
+from app.db import AsyncSessionLocal, get_db
+from app.models import Article, ArticleAccessDaily, ArticleEventReceipt, User
 
-from .api import ArticleMarkRead, ArticleResponse, ArticleUpdateLastAccessed
+from .api import (
+    ARTICLE_ID_MAX,
+    ArticleAccessBatchRequest,
+    ArticleAccessBatchResult,
+    ArticleActivity,
+    ArticleBulkMarkRead,
+    ArticleBulkMarkReadResult,
+    ArticleChanges,
+    ArticleEventBatch,
+    ArticleEventResult,
+    ArticleEventStatus,
+    ArticleLookupRequest,
+    ArticleMarkRead,
+    ArticleReadState,
+    ArticleResponse,
+    ArticleStats,
+    ArticleUpdateLastAccessed,
+)
+from .cache import read_state_cache
+from .encoding import (
+    COLUMNAR_JSON_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    encode_articles,
+    negotiate,
+)
+from .history import access_event_log
+from .readfilter import read_filter_cache
+from .stats import compute_article_stats, stats_cache
+from .sync import ArticleState, apply_event, to_utc
+from .urls import canonicalize_url, url_hash
+from .writebehind import access_coalescer
 
 router = APIRouter()
 
+articles_table = Article.__table__
+
+
+class ArticlesResponse(Response):
+    """A list of articles (ArticleResponse fields) in the media type negotiated from the Accept header; see
+    app.articles.encoding for the layouts."""
+
+    def __init__(self, articles: list[dict[str, Any]], media_type: str, headers: dict[str, str]):
+        super().__init__(encode_articles(articles, media_type), media_type=media_type, headers=headers)
+        self.headers["Vary"] = "Accept"
+
+
+# The columns of ArticleResponse, in order. List endpoints select just these and encode the rows straight to
+# JSON with orjson instead of validating a model per row; tests/test_articles.py holds them to the schema.
+ARTICLE_COLUMNS = (Article.id, Article.url, Article.date_first_accessed, Article.date_last_accessed, Article.date_read)
+
+# The alternative representations of list endpoints, for the OpenAPI schema
+ARTICLE_LIST_RESPONSES: dict[int | str, dict[str, Any]] = {
+    200: {"content": {COLUMNAR_JSON_MEDIA_TYPE: {}, MSGPACK_MEDIA_TYPE: {}}}
+}
+
+# In the RETURNING clause of an upsert, true for rows the statement inserted rather than updated
+INSERTED = literal_column("xmax = 0", Boolean).label("inserted")
+
+
+def _cache_article(user_id: str, db_article: Article) -> dict[str, Any]:
+    article = ArticleResponse.model_validate(db_article).model_dump()
+    read_state_cache.set(user_id, db_article.url, [article])
+    return article
+
+
+async def _bump_articles_version(db: AsyncSession, user_id: str) -> int:
+    """Advance the user's article change version and return it, to be stamped as the `change_version` of
+    every article the transaction writes.
+
+    Call before touching any article, unless the users row is already locked: it stays locked until commit,
+    so a user's writes commit in version order and a change feed reader never skips a version that commits
+    late.
+    """
+    version = await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(articles_version=User.articles_version + 1)
+        .returning(User.articles_version)
+    )
+    if version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return version
+
+
+async def _update_article_counters(db: AsyncSession, user_id: str, created: int = 0, read: int = 0) -> None:
+    """Apply deltas to the user's article counters, in the same transaction as the article write."""
+    values: dict[str, Any] = {}
+    if created:
+        values["article_count"] = User.article_count + created
+    if read:
+        values["read_count"] = User.read_count + read
+    if values:
+        await db.execute(update(User).where(User.id == user_id).values(**values))
+
+
+def _versioned_etag(request: Request, user_id: str, version: int, media_type: str = JSON_MEDIA_TYPE) -> str:
+    """Strong ETag for a view of a user's articles: their change version plus a digest of the request and
+    the representation served."""
+    digest = hashlib.blake2b(f"{user_id}|{request.url.path}|{request.url.query}|{media_type}".encode(), digest_size=8)
+    return f'"{version}-{digest.hexdigest()}"'
+
+
+async def _articles_etag(
+    db: AsyncSession, request: Request, user_id: str, media_type: str = JSON_MEDIA_TYPE
+) -> str | None:
+    version = await db.scalar(select(User.articles_version).where(User.id == user_id))
+    if version is None:
+        return None
+    return _versioned_etag(request, user_id, version, media_type)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(","))
+
 
 @router.patch("/articles/{article_id}/read", response_model=ArticleResponse)
-def update_article_date_read(
+async def update_article_date_read(
     article_id: int,
     article_update: ArticleMarkRead,
     user_id: str = Header(None, alias="User-Id"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     if user_id is None:
         raise HTTPException(status_code=400, detail="User ID is required")
+    if not 1 <= article_id <= ARTICLE_ID_MAX:
+        # No such article, and out of range for the id column
+        raise HTTPException(status_code=404, detail="Article not found")
 
-    db_article = db.query(Article).filter(Article.id == article_id, Article.user_id == user_id).first()
+    now = datetime.now(UTC)
+    version = await _bump_articles_version(db, user_id)
+
+    # Joining the locked row back in lets RETURNING report the read state from before the update, which
+    # is what the read counter moves by.
+    previous = (
+        select(Article.id, Article.date_read.is_not(None).label("was_read"))
+        .where(Article.id == article_id, Article.user_id == user_id)
+        .with_for_update()
+        .subquery()
+    )
+    row = (
+        await db.execute(
+            update(Article)
+            .where(Article.id == previous.c.id)
+            .values(
+                date_read=now if article_update.read else None,
+                read_state_at=now,
+                date_last_accessed=now,
+                change_version=version,
+            )
+            .returning(Article, previous.c.was_read),
+            execution_options={"populate_existing": True},
+        )
+    ).first()
 
-    if db_article is None:
+    if row is None:
         raise HTTPException(status_code=404, detail="Article not found")
+    db_article, was_read = row
+
+    await _update_article_counters(db, user_id, read=int(article_update.read) - int(was_read))
+    await db.commit()
+    access_coalescer.forget(user_id, db_article.url)
+    return _cache_article(user_id, db_article)
+
+
+@router.patch("/articles/read", response_model=ArticleBulkMarkReadResult)
+async def update_articles_date_read(
+    payload: ArticleBulkMarkRead,
+    user_id: str = Header(None, alias="User-Id"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Mark many articles read or unread in one statement, selected by id or by filter. Unlike the single
+    article PATCH this is not a visit, so last access times are left alone."""
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+    if (payload.ids is None) == (payload.filter is None):
+        raise HTTPException(status_code=400, detail="Exactly one of ids or filter is required")
+
+    # Only rows not already in the requested state, so the read counter moves by exactly the row count
+    filters = _article_filters(
+        user_id, read=not payload.read, **(payload.filter.model_dump() if payload.filter else {})
+    )
+    if payload.ids is not None:
+        filters.append(Article.id.in_(payload.ids))
 
     now = datetime.now(UTC)
+    version = await _bump_articles_version(db, user_id)
+    db_articles = list(
+        await db.scalars(
+            update(Article)
+            .where(*filters)
+            .values(date_read=now if payload.read else None, read_state_at=now, change_version=version)
+            .returning(Article),
+            execution_options={"populate_existing": True},
+        )
+    )
+    if not db_articles:
+        # Nothing changed: don't spend a version
+        await db.rollback()
+        return ArticleBulkMarkReadResult(updated=0, ids=[])
+
+    await _update_article_counters(db, user_id, read=len(db_articles) if payload.read else -len(db_articles))
+    await db.commit()
+    for db_article in db_articles:
+        access_coalescer.forget(user_id, db_article.url)
+        _cache_article(user_id, db_article)
+    return ArticleBulkMarkReadResult(updated=len(db_articles), ids=sorted(db_article.id for db_article in db_articles))
+
+
+def _parse_int(value: str, bits: int) -> int:
+    """Parse a cursor field bound for a signed integer column of `bits` bits, which Postgres would reject
+    out of range."""
+    number = int(value)
+    if not -(2 ** (bits - 1)) <= number < 2 ** (bits - 1):
+        raise ValueError(f"{number} does not fit in {bits} bits")
+    return number
+
+
+def _encode_cursor(date_last_accessed: datetime, article_id: int) -> str:
+    raw = f"{date_last_accessed.isoformat()}|{article_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
-    db_article.date_read = now if article_update.read else None
-    db_article.date_last_accessed = now
 
-    db.commit()
-    db.refresh(db_article)
-    return db_article
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        date_last_accessed, article_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(date_last_accessed), _parse_int(article_id, 32)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
-@router.get("/articles/all", response_model=list[ArticleResponse])
-def get_user_articles(
+def _article_filters(
+    user_id: str,
+    read: bool | None = None,
+    host: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> list[ColumnElement[bool]]:
+    """WHERE clauses selecting a user's articles by read state, host and last access range."""
+    filters = [Article.user_id == user_id]
+    if read is not None:
+        filters.append(Article.date_read.is_not(None) if read else Article.date_read.is_(None))
+    if host:
+        filters.append(Article.url.startswith(f"https://{host.lower()}/", autoescape=True))
+    if since:
+        filters.append(Article.date_last_accessed >= since)
+    if until:
+        filters.append(Article.date_last_accessed < until)
+    return filters
+
+
+@router.get("/articles/all", response_model=list[ArticleResponse], responses=ARTICLE_LIST_RESPONSES)
+async def get_user_articles(
+    request: Request,
+    limit: int = Query(Config.Articles.PAGE_SIZE_DEFAULT, ge=1, le=Config.Articles.PAGE_SIZE_MAX),
+    cursor: str | None = Query(None),
+    read: bool | None = Query(None),
+    host: str | None = Query(None),
+    since: datetime | None = Query(None),
+    until: datetime | None = Query(None),
+    user_id: str = Header(None, alias="User-Id"),
+    db: AsyncSession = Depends(get_db),
+):
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+
+    media_type = negotiate(request.headers.get("Accept"))
+    headers = {}
+    etag = await _articles_etag(db, request, user_id, media_type)
+    if etag:
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+        headers["ETag"] = etag
+
+    # Most recently accessed first; the next page is handed back in the X-Next-Cursor header so the
+    # body stays a plain list of articles.
+    query = select(*ARTICLE_COLUMNS).where(*_article_filters(user_id, read, host, since, until))
+    if cursor:
+        cursor_date, cursor_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(Article.date_last_accessed, Article.id) < tuple_(literal(cursor_date), literal(cursor_id))
+        )
+
+    query = query.order_by(Article.date_last_accessed.desc(), Article.id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1].date_last_accessed, rows[-1].id)
+
+    return ArticlesResponse([row._asdict() for row in rows], media_type, headers)
+
+
+def _encode_change_cursor(change_version: int, article_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{change_version}|{article_id}".encode()).decode()
+
+
+def _decode_change_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        change_version, article_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return _parse_int(change_version, 64), _parse_int(article_id, 32)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/articles/changes", response_model=ArticleChanges)
+async def get_user_article_changes(
+    cursor: str | None = Query(None),
+    limit: int = Query(Config.Articles.PAGE_SIZE_DEFAULT, ge=1, le=Config.Articles.PAGE_SIZE_MAX),
+    user_id: str = Header(None, alias="User-Id"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Articles created or modified after `cursor`, in change order. Without a cursor, every article is a
+    change, so the first sync pages through the whole history and later ones only through what changed."""
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+
+    since_version, since_id = _decode_change_cursor(cursor) if cursor else (0, 0)
+    articles = list(
+        await db.scalars(
+            select(Article)
+            .where(
+                Article.user_id == user_id,
+                tuple_(Article.change_version, Article.id) > tuple_(literal(since_version), literal(since_id)),
+            )
+            .order_by(Article.change_version, Article.id)
+            .limit(limit + 1)
+        )
+    )
+
+    has_more = len(articles) > limit
+    articles = articles[:limit]
+    if articles:
+        since_version, since_id = articles[-1].change_version, articles[-1].id
+    return ArticleChanges(
+        articles=[ArticleResponse.model_validate(article) for article in articles],
+        cursor=_encode_change_cursor(since_version, since_id),
+        has_more=has_more,
+    )
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "msgpack": MSGPACK_MEDIA_TYPE}
+
+
+async def _iter_export(user_id: str, export_format: str) -> AsyncIterator[bytes]:
+    # The generator owns its session: it is consumed while the response streams, after request-scoped
+    # dependencies have been torn down.
+    async with AsyncSessionLocal() as db:
+        rows = await db.stream(
+            select(*ARTICLE_COLUMNS)
+            .where(Article.user_id == user_id)
+            .order_by(Article.id)
+            .execution_options(yield_per=Config.Articles.EXPORT_CHUNK_SIZE)
+        )
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(rows.keys())
+            async for partition in rows.partitions():
+                writer.writerows(
+                    (row.id, row.url, *(value.isoformat() if value else "" for value in row[2:])) for row in partition
+                )
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+        elif export_format == "msgpack":
+            # A stream of columnar documents, one per chunk (msgpack.Unpacker reads them back one by one)
+            async for partition in rows.partitions():
+                yield encode_articles([row._asdict() for row in partition], MSGPACK_MEDIA_TYPE)
+        else:
+            async for partition in rows.partitions():
+                yield b"".join(orjson.dumps(row._asdict()) + b"\n" for row in partition)
+
+
+@router.get("/articles/export")
+async def export_user_articles(
+    request: Request,
+    export_format: Literal["ndjson", "csv", "msgpack"] | None = Query(None, alias="format"),
     user_id: str = Header(None, alias="User-Id"),
-    db: Session = Depends(get_db),
 ):
     if user_id is None:
         raise HTTPException(status_code=400, detail="User ID is required")
-    articles = db.query(Article).filter(Article.user_id == user_id).all()
-    return articles
+
+    if export_format is None:
+        export_format = "msgpack" if negotiate(request.headers.get("Accept")) == MSGPACK_MEDIA_TYPE else "ndjson"
+
+    return StreamingResponse(
+        _iter_export(user_id, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="articles.{export_format}"', "Vary": "Accept"},
+    )
 
 
-@router.get("/articles/", response_model=list[ArticleResponse])
-def get_user_article_by_url(
+@router.get("/articles/", response_model=list[ArticleResponse], responses=ARTICLE_LIST_RESPONSES)
+async def get_user_article_by_url(
+    request: Request,
     url: str = Query(...),
     user_id: str = Header(None, alias="User-Id"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+):
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+
+    media_type = negotiate(request.headers.get("Accept"))
+    canonical_url = canonicalize_url(url)
+    result = read_state_cache.get(user_id, canonical_url)
+
+    # Cache hits are answered without touching the database: the version behind the ETag is only looked up
+    # when the client revalidates, or when the article has to be read anyway.
+    headers = {}
+    if result is None or request.headers.get("If-None-Match"):
+        etag = await _articles_etag(db, request, user_id, media_type)
+        if etag:
+            if _etag_matches(request, etag):
+                return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+            headers["ETag"] = etag
+
+    if result is None:
+        rows = await db.execute(
+            select(*ARTICLE_COLUMNS).where(
+                Article.user_id == user_id, Article.url_hash == url_hash(canonical_url), Article.url == canonical_url
+            )
+        )
+        result = [row._asdict() for row in rows]
+        read_state_cache.set(user_id, canonical_url, result)
+    return ArticlesResponse(result, media_type, headers)
+
+
+@router.get("/articles/read-filter", response_class=Response)
+async def get_user_read_filter(
+    request: Request,
+    user_id: str = Header(None, alias="User-Id"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bloom filter of the url hashes of the user's read articles, as raw bits (layout and hashing in
+    app.articles.readfilter.BloomFilter). A URL whose hash isn't in it is definitely unread; one that is
+    should be confirmed with POST /articles/lookup."""
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+
+    row = (await db.execute(select(User.articles_version, User.read_count).where(User.id == user_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    version, read_count = row
+
+    etag = _versioned_etag(request, user_id, version)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    read_filter = await read_filter_cache.get(db, user_id, version, read_count)
+    return Response(
+        content=bytes(read_filter.bloom.array),
+        media_type="application/octet-stream",
+        headers={
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "X-Bloom-Bits": str(read_filter.bloom.bits),
+            "X-Bloom-Hashes": str(read_filter.bloom.hashes),
+        },
+    )
+
+
+@router.post("/articles/lookup", response_model=dict[str, ArticleReadState])
+async def lookup_user_articles(
+    payload: ArticleLookupRequest,
+    user_id: str = Header(None, alias="User-Id"),
+    db: AsyncSession = Depends(get_db),
 ):
     if user_id is None:
         raise HTTPException(status_code=400, detail="User ID is required")
-    articles = db.query(Article).filter(Article.url == url, Article.user_id == user_id).all()
-    return articles
+
+    if not payload.urls:
+        return {}
+
+    # Several requested URLs may share a canonical form; each of them gets the article's state.
+    requested: dict[str, list[str]] = {}
+    for url in payload.urls:
+        requested.setdefault(canonicalize_url(url), []).append(url)
+
+    # Bind the hashes as one array parameter so the statement text doesn't vary with the batch size.
+    hashes = bindparam("url_hashes", sorted({url_hash(url) for url in requested}), type_=ARRAY(BigInteger))
+    rows = await db.execute(
+        select(Article.url, Article.id, Article.date_read).where(
+            Article.user_id == user_id, Article.url_hash == any_(hashes)
+        )
+    )
+    return {
+        url: ArticleReadState(id=row.id, date_read=row.date_read) for row in rows for url in requested.get(row.url, [])
+    }
+
+
+@router.get("/articles/activity", response_model=list[ArticleActivity])
+async def get_user_activity(
+    since: date | None = Query(None),
+    until: date | None = Query(None),
+    user_id: str = Header(None, alias="User-Id"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Visits per UTC day and host, from the daily rollups (see app.articles.rollup); `until` is exclusive."""
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+
+    if since is None:
+        since = datetime.now(UTC).date() - timedelta(days=Config.Articles.ACTIVITY_DAYS_DEFAULT)
+    query = select(ArticleAccessDaily).where(ArticleAccessDaily.user_id == user_id, ArticleAccessDaily.day >= since)
+    if until:
+        query = query.where(ArticleAccessDaily.day < until)
+    return list(await db.scalars(query.order_by(ArticleAccessDaily.day, ArticleAccessDaily.host)))
+
+
+@router.get("/articles/stats", response_model=ArticleStats)
+async def get_user_article_stats(
+    days: int = Query(Config.Articles.STATS_DAYS_DEFAULT, ge=1, le=Config.Articles.STATS_DAYS_MAX),
+    user_id: str = Header(None, alias="User-Id"),
+    db: AsyncSession = Depends(get_db),
+):
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+
+    version = await db.scalar(select(User.articles_version).where(User.id == user_id))
+    if version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    today = datetime.now(UTC).date()
+    key = f"article-stats:{user_id}:{version}:{today}:{days}"
+    stats = stats_cache.get(key)
+    if stats is None:
+        stats = await compute_article_stats(db, user_id, today, days)
+        stats_cache.set(key, stats, Config.Articles.STATS_CACHE_TTL_SECONDS)
+    return stats
+
+
+async def _coalesced_article(
+    db: AsyncSession, user_id: str, url: str, article_id: int, now: datetime
+) -> dict[str, Any] | None:
+    """The state of an article whose access was coalesced, with the queued access time. Read from the read
+    state cache, or the database on a miss, so writes other workers made since are kept."""
+    cached = read_state_cache.get(user_id, url)
+    article = next((article for article in cached or () if article["id"] == article_id), None)
+    if article is None:
+        row = (
+            await db.execute(select(*ARTICLE_COLUMNS).where(Article.user_id == user_id, Article.id == article_id))
+        ).first()
+        if row is None:
+            return None
+        article = row._asdict()
+
+    article = {**article, "date_last_accessed": now.replace(tzinfo=None)}
+    read_state_cache.set(user_id, url, [article])
+    return article
 
 
 @router.post("/articles/access", response_model=ArticleResponse)
-def post_article_access(
+async def post_article_access(
     payload: ArticleUpdateLastAccessed,
     user_id: str = Header(None, alias="User-Id"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     if user_id is None:
         raise HTTPException(status_code=400, detail="User ID is required")
@@ -72,24 +590,274 @@ def post_article_access(
     if not Config.SupportedSites.is_supported(payload.url):
         raise HTTPException(status_code=400, detail="Unsupported website")
 
-    db_article = db.query(Article).filter(Article.url == payload.url, Article.user_id == user_id).first()
+    canonical_url = canonicalize_url(payload.url)
     now = datetime.now(UTC)
 
-    if not db_article:
-        if payload.create_if_not_exist:
-            db_article = Article(
+    article_id = access_coalescer.coalesce(user_id, canonical_url, now)
+    if article_id is not None:
+        coalesced = await _coalesced_article(db, user_id, canonical_url, article_id, now)
+        if coalesced is not None:
+            access_event_log.record(user_id, article_id, now)
+            return coalesced
+        # Gone since it was remembered
+        access_coalescer.forget(user_id, canonical_url)
+
+    version = await _bump_articles_version(db, user_id)
+
+    # A single statement either way: the upsert path relies on the `_user_url_hash_uc` constraint so
+    # concurrent first visits to the same URL resolve inside Postgres instead of racing a SELECT-then-INSERT.
+    stmt: ReturningInsert[tuple[Article, bool]] | ReturningUpdate[tuple[Article, bool]]
+    if payload.create_if_not_exist:
+        stmt = (
+            insert(Article)
+            .values(
                 user_id=user_id,
-                url=payload.url,
+                url=canonical_url,
+                url_hash=url_hash(canonical_url),
                 date_first_accessed=now,
                 date_last_accessed=now,
+                change_version=version,
+            )
+            .on_conflict_do_update(
+                constraint="_user_url_hash_uc", set_={"date_last_accessed": now, "change_version": version}
             )
-            db.add(db_article)
+            .returning(Article, INSERTED)
+        )
+    else:
+        stmt = (
+            update(Article)
+            .where(Article.user_id == user_id, Article.url_hash == url_hash(canonical_url))
+            .values(date_last_accessed=now, change_version=version)
+            .returning(Article, false())
+        )
+
+    row = (await db.execute(stmt, execution_options={"populate_existing": True})).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    db_article, inserted = row
+
+    await _update_article_counters(db, user_id, created=int(inserted))
+    await db.commit()
+    article = _cache_article(user_id, db_article)
+    access_coalescer.remember(user_id, canonical_url, db_article.id)
+    access_event_log.record(user_id, db_article.id, now)
+    return article
+
+
+@router.post("/articles/access/batch", response_model=list[ArticleAccessBatchResult])
+async def post_article_access_batch(
+    payload: ArticleAccessBatchRequest,
+    user_id: str = Header(None, alias="User-Id"),
+    db: AsyncSession = Depends(get_db),
+):
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+
+    canonical_urls = {item.url: canonicalize_url(item.url) for item in payload.items}
+    hosts = {url: urlsplit(url).hostname or "" for url in canonical_urls.values()}
+    supported_hosts = {host: Config.SupportedSites.is_host_supported(host) for host in set(hosts.values())}
+    supported_urls = {url for url, host in hosts.items() if supported_hosts[host]}
+
+    # Items for the same URL collapse onto one row: if any of them may create it, it is upserted.
+    create_urls = {
+        canonical_urls[item.url]
+        for item in payload.items
+        if canonical_urls[item.url] in supported_urls and item.create_if_not_exist
+    }
+    touch_urls = supported_urls - create_urls
+
+    now = datetime.now(UTC)
+    articles: dict[str, ArticleResponse] = {}
+    created = 0
+    version = await _bump_articles_version(db, user_id) if supported_urls else 0
+
+    # Rows are sorted so concurrent batches for the same user take row locks in the same order.
+    if create_urls:
+        stmt = insert(Article).on_conflict_do_update(
+            constraint="_user_url_hash_uc", set_={"date_last_accessed": now, "change_version": version}
+        )
+        rows = [
+            {
+                "user_id": user_id,
+                "url": url,
+                "url_hash": url_hash(url),
+                "date_first_accessed": now,
+                "date_last_accessed": now,
+                "change_version": version,
+            }
+            for url in sorted(create_urls, key=url_hash)
+        ]
+        upserted = await db.execute(
+            stmt.returning(Article, INSERTED), rows, execution_options={"populate_existing": True}
+        )
+        for db_article, inserted in upserted:
+            articles[db_article.url] = ArticleResponse.model_validate(db_article)
+            created += inserted
+
+    if touch_urls:
+        update_stmt = (
+            update(Article)
+            .where(Article.user_id == user_id, Article.url_hash.in_(sorted(url_hash(url) for url in touch_urls)))
+            .values(date_last_accessed=now, change_version=version)
+            .returning(Article)
+        )
+        touched = await db.scalars(update_stmt, execution_options={"populate_existing": True})
+        for db_article in touched:
+            articles[db_article.url] = ArticleResponse.model_validate(db_article)
+
+    if articles:
+        await _update_article_counters(db, user_id, created=created)
+        await db.commit()
+    else:
+        # Nothing was written: don't spend a version
+        await db.rollback()
+    for url, article in articles.items():
+        read_state_cache.set(user_id, url, [article.model_dump()])
+        access_event_log.record(user_id, article.id, now)
+
+    results = []
+    for item in payload.items:
+        canonical_url = canonical_urls[item.url]
+        if canonical_url not in supported_urls:
+            results.append(ArticleAccessBatchResult(url=item.url, status_code=400, detail="Unsupported website"))
+        elif canonical_url not in articles:
+            results.append(ArticleAccessBatchResult(url=item.url, status_code=404, detail="Article not found"))
         else:
-            raise HTTPException(status_code=404, detail="Article not found")
+            results.append(ArticleAccessBatchResult(url=item.url, status_code=200, article=articles[canonical_url]))
+    return results
+
+
+@router.post("/articles/events", response_model=list[ArticleEventResult])
+async def post_article_events(
+    payload: ArticleEventBatch,
+    user_id: str = Header(None, alias="User-Id"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Apply a backlog of client-timestamped accesses and read/unread toggles in one transaction.
+
+    Events are merged by their own timestamps rather than arrival order (see app.articles.sync), and an
+    event id that was already applied is reported as a duplicate and skipped.
+    """
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+
+    now = datetime.now(UTC)
+    # Lock the user first, as every write path does, but only spend a version once there is something to write:
+    # replays of a backlog that was already applied are common and shouldn't invalidate anything
+    if await db.scalar(select(User.id).where(User.id == user_id).with_for_update()) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Record every id up front: the ones that come back are new, both across requests and within the batch
+    event_ids = list(dict.fromkeys(event.id for event in payload.events))
+    new_ids: set[str] = set()
+    if event_ids:
+        new_ids.update(
+            await db.scalars(
+                insert(ArticleEventReceipt)
+                .values([{"user_id": user_id, "event_id": event_id, "received_at": now} for event_id in event_ids])
+                .on_conflict_do_nothing()
+                .returning(ArticleEventReceipt.event_id)
+            )
+        )
+
+    canonical_urls = [canonicalize_url(event.url) for event in payload.events]
+    statuses: dict[int, ArticleEventStatus] = {}
+    # canonical url -> (index, type, occurred at) of each event to merge into it
+    events_by_url: dict[str, list[tuple[int, str, datetime]]] = {}
+    for index, event in enumerate(payload.events):
+        if event.id not in new_ids:
+            statuses[index] = "duplicate"
+            continue
+        new_ids.discard(event.id)
+        if not Config.SupportedSites.is_supported(event.url):
+            statuses[index] = "unsupported"
+            continue
+        events_by_url.setdefault(canonical_urls[index], []).append((index, event.type, to_utc(event.occurred_at, now)))
+
+    # Articles that may be created start out at their earliest event and are then merged like the rest, which
+    # stamps their change version
+    create_rows = []
+    for url, url_events in sorted(events_by_url.items(), key=lambda item: url_hash(item[0])):
+        if any(payload.events[index].create_if_not_exist for index, _, _ in url_events):
+            first = min(occurred_at for _, _, occurred_at in url_events)
+            create_rows.append(
+                {
+                    "user_id": user_id,
+                    "url": url,
+                    "url_hash": url_hash(url),
+                    "date_first_accessed": first,
+                    "date_last_accessed": first,
+                }
+            )
+    created = 0
+    if create_rows:
+        inserted = await db.scalars(insert(Article).values(create_rows).on_conflict_do_nothing().returning(Article.id))
+        created = len(inserted.all())
+
+    # Lock the rows in id order, so batches for the same user can't deadlock, then merge in memory
+    db_articles: list[Article] = []
+    if events_by_url:
+        hashes = bindparam("url_hashes", sorted({url_hash(url) for url in events_by_url}), type_=ARRAY(BigInteger))
+        db_articles = list(
+            await db.scalars(
+                select(Article)
+                .where(Article.user_id == user_id, Article.url_hash == any_(hashes))
+                .order_by(Article.id)
+                .with_for_update()
+            )
+        )
+
+    read_delta = 0
+    merged = []
+    articles: dict[str, ArticleResponse] = {}
+    for db_article in db_articles:
+        state = ArticleState(
+            db_article.date_first_accessed,
+            db_article.date_last_accessed,
+            db_article.date_read,
+            db_article.read_state_at,
+        )
+        was_read = state.is_read
+        for index, event_type, occurred_at in sorted(events_by_url.pop(db_article.url), key=lambda e: (e[2], e[0])):
+            statuses[index] = "applied" if apply_event(state, event_type, occurred_at) else "stale"
+        read_delta += int(state.is_read) - int(was_read)
+        merged.append({"article_id": db_article.id, **{f"merged_{key}": value for key, value in asdict(state).items()}})
+        articles[db_article.url] = ArticleResponse.model_validate(
+            {"id": db_article.id, "url": db_article.url, **asdict(state)}
+        )
+
+    for url_events in events_by_url.values():
+        for index, _, _ in url_events:
+            statuses[index] = "not_found"
+
+    if not merged:
+        # Nothing was written: don't spend a version, only keep the receipts
+        await db.commit()
     else:
-        db_article.date_last_accessed = now
+        version = await _bump_articles_version(db, user_id)
+        await db.execute(
+            update(articles_table)
+            .where(articles_table.c.id == bindparam("article_id"))
+            .values(
+                date_first_accessed=bindparam("merged_date_first_accessed"),
+                date_last_accessed=bindparam("merged_date_last_accessed"),
+                date_read=bindparam("merged_date_read"),
+                read_state_at=bindparam("merged_read_state_at"),
+                change_version=version,
+            ),
+            merged,
+        )
+        await _update_article_counters(db, user_id, created=created, read=read_delta)
+        await db.commit()
 
-    db.commit()
-    db.refresh(db_article)
+    for url, article in articles.items():
+        read_state_cache.set(user_id, url, [article.model_dump()])
+        access_coalescer.forget(user_id, url)
 
-    return db_article
+    results = []
+    for index, event in enumerate(payload.events):
+        merged_into = articles.get(canonical_urls[index]) if statuses[index] in ("applied", "stale") else None
+        if merged_into and statuses[index] == "applied" and event.type == "access":
+            access_event_log.record(user_id, merged_into.id, to_utc(event.occurred_at, now))
+        results.append(ArticleEventResult(id=event.id, status=statuses[index], article=merged_into))
+    return results
@@ -0,0 +1,104 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import Date, Integer, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.models import Article
+
+from .api import ArticleStats, DailyReads, SiteStats, WeeklyReads
+from .cache import LRUCacheBackend
+
+# Keyed by article version, which every write bumps, so entries never need invalidating; stale ones age out.
+stats_cache = LRUCacheBackend(Config.Articles.STATS_CACHE_MAX_ENTRIES)
+
+
+async def _reads_per_day(db: AsyncSession, user_id: str, since: date) -> list[DailyReads]:
+    day = cast(Article.date_read, Date)
+    rows = await db.execute(
+        select(day, func.count())
+        .where(Article.user_id == user_id, Article.date_read >= datetime.combine(since, time.min))
+        .group_by(day)
+        .order_by(day)
+    )
+    return [DailyReads(day=day, reads=reads) for day, reads in rows]
+
+
+async def _reads_per_week(db: AsyncSession, user_id: str, since: date) -> list[WeeklyReads]:
+    week = cast(func.date_trunc("week", Article.date_read), Date)
+    week_start = datetime.combine(since - timedelta(days=since.weekday()), time.min)
+    rows = await db.execute(
+        select(week, func.count())
+        .where(Article.user_id == user_id, Article.date_read >= week_start)
+        .group_by(week)
+        .order_by(week)
+    )
+    return [WeeklyReads(week=week, reads=reads) for week, reads in rows]
+
+
+async def _per_site(db: AsyncSession, user_id: str) -> list[SiteStats]:
+    # Canonical URLs all look like https://<host>/...
+    host = func.split_part(Article.url, "/", 3)
+    rows = await db.execute(
+        select(host, func.count(), func.count(Article.date_read)).where(Article.user_id == user_id).group_by(host)
+    )
+    # A user reads from a handful of hosts: each counts towards the most specific whitelisted site it belongs to
+    sites: dict[str, SiteStats] = {}
+    for host_name, articles, read in rows:
+        site = Config.SupportedSites.site_of_host(host_name.partition(":")[0])
+        if site is None:
+            continue
+        stats = sites.setdefault(site, SiteStats(site=site, articles=0, read=0))
+        stats.articles += articles
+        stats.read += read
+    return sorted(sites.values(), key=lambda stats: (-stats.articles, stats.site))
+
+
+async def _streaks(db: AsyncSession, user_id: str, today: date) -> tuple[int, int]:
+    # Gaps and islands: consecutive days minus their rank are equal, so each streak shares one group value
+    days = (
+        select(cast(Article.date_read, Date).label("day"))
+        .where(Article.user_id == user_id, Article.date_read.is_not(None))
+        .distinct()
+        .subquery()
+    )
+    islands = select(
+        days.c.day, (days.c.day - cast(func.row_number().over(order_by=days.c.day), Integer)).label("grp")
+    ).subquery()
+    streaks = (
+        select(func.max(islands.c.day).label("last_day"), func.count().label("length"))
+        .group_by(islands.c.grp)
+        .subquery()
+    )
+    current, longest = (
+        await db.execute(
+            select(
+                func.max(streaks.c.length).filter(streaks.c.last_day >= today - timedelta(days=1)),
+                func.max(streaks.c.length),
+            )
+        )
+    ).one()
+    return current or 0, longest or 0
+
+
+async def _median_seconds_to_read(db: AsyncSession, user_id: str) -> float | None:
+    seconds = func.extract("epoch", Article.date_read - Article.date_first_accessed)
+    return await db.scalar(
+        select(func.percentile_cont(0.5).within_group(seconds)).where(
+            Article.user_id == user_id, Article.date_read.is_not(None), Article.date_first_accessed.is_not(None)
+        )
+    )
+
+
+async def compute_article_stats(db: AsyncSession, user_id: str, today: date, days: int) -> ArticleStats:
+    """Reading analytics for a user; reads per day and week cover the `days` up to and including `today`."""
+    since = today - timedelta(days=days - 1)
+    current_streak, longest_streak = await _streaks(db, user_id, today)
+    return ArticleStats(
+        reads_per_day=await _reads_per_day(db, user_id, since),
+        reads_per_week=await _reads_per_week(db, user_id, since),
+        sites=await _per_site(db, user_id),
+        current_streak=current_streak,
+        longest_streak=longest_streak,
+        median_seconds_to_read=await _median_seconds_to_read(db, user_id),
+    )
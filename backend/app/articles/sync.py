@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+
+@dataclass
+class ArticleState:
+    """The mergeable fields of an article, as naive UTC timestamps."""
+
+    date_first_accessed: datetime | None
+    date_last_accessed: datetime | None
+    date_read: datetime | None
+    read_state_at: datetime | None
+
+    @property
+    def is_read(self) -> bool:
+        return self.date_read is not None
+
+
+def to_utc(timestamp: datetime, now: datetime) -> datetime:
+    """Naive UTC for a client timestamp, clamped to `now` so a fast client clock can't win every merge."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(UTC).replace(tzinfo=None)
+    return min(timestamp, now.replace(tzinfo=None))
+
+
+def apply_event(state: ArticleState, event_type: str, occurred_at: datetime) -> bool:
+    """Merge one event into `state`. Returns False if it lost to a newer read state and was ignored.
+
+    Accesses only ever widen the first/last access range. Read and unread are last-writer-wins on
+    `read_state_at`, and like PATCH /articles/{id}/read they also count as an access.
+    """
+    if event_type != "access":
+        if state.read_state_at is not None and occurred_at < state.read_state_at:
+            return False
+        state.date_read = occurred_at if event_type == "read" else None
+        state.read_state_at = occurred_at
+
+    state.date_first_accessed = min(filter(None, (state.date_first_accessed, occurred_at)))
+    state.date_last_accessed = max(filter(None, (state.date_last_accessed, occurred_at)))
+    return True
@@ -0,0 +1,61 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only identify where a visit came from, never which story it is
+TRACKING_PARAM_PREFIXES = ("utm_",)
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid"})
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize an article URL so every way of linking to the same story maps to one string.
+
+    The scheme is upgraded to https, the host lowercased, default and invalid ports, credentials, fragments,
+    tracking parameters and trailing slashes dropped, and the remaining query parameters sorted. URLs that
+    can't be parsed at all are returned as they are.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        # e.g. an unterminated IPv6 host: nothing to normalize, and never a supported site
+        return url
+    scheme = parts.scheme.lower()
+    if scheme in ("", "http"):
+        scheme = "https"
+
+    try:
+        port = parts.port
+    except ValueError:
+        # Out of range or not a number: no server listens there, so the link can only mean the default port
+        port = None
+
+    netloc = (parts.hostname or "").rstrip(".")
+    if port and port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path or "/"
+    if path != "/":
+        path = path.rstrip("/") or "/"
+
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not _is_tracking_param(name)
+        )
+    )
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def url_hash(canonical_url: str) -> int:
+    """Signed 64-bit hash of a canonical URL, used as the fixed-width lookup key for articles."""
+    digest = hashlib.blake2b(canonical_url.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import Config
+from app.models import Article, User
+
+logger = logging.getLogger(__name__)
+
+articles_table = Article.__table__
+
+
+class AccessCoalescer:
+    """Write-behind buffer for last-accessed timestamps.
+
+    The first access to a (user, url) pair is written synchronously and its article id remembered. Further
+    accesses within `window_seconds` only queue the new timestamp; queued timestamps are written in one batched
+    UPDATE by `flush`, which `run` calls every window.
+
+    Only ids and timestamps are kept per worker, never article state: a write handled by another worker (say,
+    marking the article read) can't be undone by serving or caching a stale copy from here.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        # (user_id, url) -> (monotonic time of the synchronous write, article id)
+        self._recent: dict[tuple[str, str], tuple[float, int]] = {}
+        # article id -> (user_id, newest access time)
+        self._pending: dict[int, tuple[str, datetime]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def coalesce(self, user_id: str, url: str, now: datetime) -> int | None:
+        """Queue an access to a recently written article and return its id, or None if the access has to be
+        written synchronously. The rest of the article is for the caller to read from the read state cache or
+        the database."""
+        if not self.enabled:
+            return None
+
+        recent = self._recent.get((user_id, url))
+        if recent is None:
+            return None
+        written_at, article_id = recent
+        if time.monotonic() - written_at >= self.window_seconds:
+            del self._recent[(user_id, url)]
+            return None
+
+        self._pending[article_id] = (user_id, now)
+        return article_id
+
+    def remember(self, user_id: str, url: str, article_id: int) -> None:
+        if self.enabled:
+            self._recent[(user_id, url)] = (time.monotonic(), article_id)
+
+    def forget(self, user_id: str, url: str) -> None:
+        self._recent.pop((user_id, url), None)
+
+    def _expire_recent(self) -> None:
+        cutoff = time.monotonic() - self.window_seconds
+        self._recent = {key: recent for key, recent in self._recent.items() if recent[0] > cutoff}
+
+    async def flush(self, session_factory: async_sessionmaker) -> int:
+        """Write queued timestamps in one batch and return how many articles were updated."""
+        self._expire_recent()
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        # Guarded so a late flush never moves a timestamp backwards past a synchronous write
+        stmt = (
+            update(articles_table)
+            .where(
+                articles_table.c.id == bindparam("article_id"),
+                articles_table.c.date_last_accessed < bindparam("accessed_at"),
+            )
+            .values(date_last_accessed=bindparam("accessed_at"), change_version=bindparam("change_version"))
+        )
+        user_ids = sorted({user_id for user_id, _ in pending.values()})
+
+        try:
+            async with session_factory() as db:
+                # Users first, as on the request path, so their articles get the bumped versions in order
+                rows = await db.execute(
+                    update(User)
+                    .where(User.id.in_(user_ids))
+                    .values(articles_version=User.articles_version + 1)
+                    .returning(User.id, User.articles_version)
+                )
+                versions = {user_id: version for user_id, version in rows}
+                params = [
+                    {"article_id": article_id, "accessed_at": accessed_at, "change_version": versions[user_id]}
+                    for article_id, (user_id, accessed_at) in sorted(pending.items())
+                    if user_id in versions
+                ]
+                if params:
+                    await db.execute(stmt, params)
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to flush %d coalesced article accesses", len(pending))
+            # Requeue, keeping whichever timestamp is newer
+            for article_id, (user_id, accessed_at) in pending.items():
+                queued = self._pending.get(article_id)
+                if queued is None or queued[1] < accessed_at:
+                    self._pending[article_id] = (user_id, accessed_at)
+            raise
+        return len(pending)
+
+    async def run(self, session_factory: async_sessionmaker) -> None:
+        while True:
+            await asyncio.sleep(self.window_seconds)
+            try:
+                await self.flush(session_factory)
+            except Exception:
+                # Already logged and requeued; try again next window
+                pass
+
+
+access_coalescer = AccessCoalescer(Config.Articles.ACCESS_WRITE_BEHIND_SECONDS)
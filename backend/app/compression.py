@@ -0,0 +1,29 @@
+"""Response compression that keeps ETags honest.
+
+A strong ETag promises byte-identical bodies, which a gzipped response and the uncompressed one with the same
+tag are not: a cache holding one could answer a conditional request for the other with a mismatched body.
+`GZipMiddleware` here compresses as Starlette's does, and marks the ETag of every response it compresses weak.
+Conditional requests still match: If-None-Match is compared weakly (app.articles.route._etag_matches).
+"""
+
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware as StarletteGZipMiddleware
+from starlette.types import Message, Receive, Scope, Send
+
+
+class GZipMiddleware(StarletteGZipMiddleware):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await super().__call__(scope, receive, send)
+            return
+
+        async def send_with_weak_etag(message: Message) -> None:
+            # Sent once the wrapped responder has decided whether to compress
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                etag = headers.get("ETag")
+                if etag and not etag.startswith("W/") and headers.get("Content-Encoding") == "gzip":
+                    headers["ETag"] = f"W/{etag}"
+            await send(message)
+
+        await super().__call__(scope, receive, send_with_weak_etag)
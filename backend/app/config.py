@@ -1,4 +1,56 @@
+import os
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+
 class Config:
+    class Articles:
+        # Upper bound on items accepted by POST /articles/access/batch
+        ACCESS_BATCH_MAX_ITEMS = 500
+        # Upper bound on URLs accepted by POST /articles/lookup
+        LOOKUP_MAX_URLS = 200
+        # Page size bounds for GET /articles/all
+        PAGE_SIZE_DEFAULT = 100
+        PAGE_SIZE_MAX = 1000
+        # Rows fetched per server-side cursor round trip by GET /articles/export
+        EXPORT_CHUNK_SIZE = 1000
+        # Read-state cache behind GET /articles/?url=
+        READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "10000"))
+        READ_CACHE_TTL_SECONDS = float(os.getenv("READ_CACHE_TTL_SECONDS", "300"))
+        # Coalesce repeated accesses to an article within this many seconds into batched writes (0 disables)
+        ACCESS_WRITE_BEHIND_SECONDS = float(os.getenv("ACCESS_WRITE_BEHIND_SECONDS", "0"))
+        # Access history: buffered visits are inserted every this many seconds, or as soon as a batch fills
+        # (0 disables recording)
+        ACCESS_EVENTS_FLUSH_SECONDS = float(os.getenv("ACCESS_EVENTS_FLUSH_SECONDS", "5"))
+        ACCESS_EVENTS_BATCH_SIZE = 1000
+        # Visits held in memory while the database is unreachable; the oldest are dropped beyond this
+        ACCESS_EVENTS_BUFFER_MAX = 100_000
+        # Raw visits older than this are pruned once rolled up into daily buckets
+        ACCESS_EVENTS_RETENTION_DAYS = int(os.getenv("ACCESS_EVENTS_RETENTION_DAYS", "90"))
+        # GET /articles/read-filter: target false positive rate, and how many users' filters a worker keeps
+        READ_FILTER_FALSE_POSITIVE_RATE = float(os.getenv("READ_FILTER_FALSE_POSITIVE_RATE", "0.01"))
+        READ_FILTER_CACHE_MAX_ENTRIES = int(os.getenv("READ_FILTER_CACHE_MAX_ENTRIES", "1000"))
+        READ_FILTER_CACHE_TTL_SECONDS = float(os.getenv("READ_FILTER_CACHE_TTL_SECONDS", "300"))
+        # Upper bound on ids accepted by PATCH /articles/read
+        BULK_READ_MAX_IDS = 1000
+        # Upper bound on events accepted by POST /articles/events
+        EVENTS_MAX_ITEMS = 1000
+        # Idempotency keys are remembered this long: replays of older events may apply twice
+        EVENT_RECEIPTS_RETENTION_DAYS = int(os.getenv("EVENT_RECEIPTS_RETENTION_DAYS", "30"))
+        # Default range of GET /articles/activity
+        ACTIVITY_DAYS_DEFAULT = 30
+        # Range of the per-day and per-week reads in GET /articles/stats
+        STATS_DAYS_DEFAULT = 90
+        STATS_DAYS_MAX = 366
+        # Computed stats are kept per user and article version, i.e. until the user's next write
+        STATS_CACHE_MAX_ENTRIES = int(os.getenv("STATS_CACHE_MAX_ENTRIES", "1000"))
+        STATS_CACHE_TTL_SECONDS = float(os.getenv("STATS_CACHE_TTL_SECONDS", "300"))
+
+    class Users:
+        # Articles embedded in login responses when `include_articles` is set
+        ARTICLES_LIMIT_DEFAULT = 50
+        ARTICLES_LIMIT_MAX = 500
+
     class SupportedSites:
         WHITELIST = [
             "news.yahoo.com",
@@ -15,9 +67,56 @@ class Config:
             "economist.com",
         ]
 
+        # Extra sites, comma separated in SUPPORTED_SITES and/or one per line in the file at SUPPORTED_SITES_FILE
+        EXTRA_SITES_ENV = "SUPPORTED_SITES"
+        EXTRA_SITES_FILE_ENV = "SUPPORTED_SITES_FILE"
+
+        # Compiled whitelist: each site as a lowercase hostname suffix
+        _suffixes: frozenset[str] = frozenset()
+
+        @classmethod
+        def load(cls) -> None:
+            """(Re)compile the whitelist from WHITELIST plus the sites configured in the environment."""
+            sites = list(cls.WHITELIST)
+            sites.extend(os.getenv(cls.EXTRA_SITES_ENV, "").split(","))
+            sites_file = os.getenv(cls.EXTRA_SITES_FILE_ENV)
+            if sites_file:
+                with open(sites_file) as f:
+                    sites.extend(line.split("#", 1)[0] for line in f)
+            cls._suffixes = frozenset(site.strip().lower().strip(".") for site in sites if site.strip())
+            cls.site_of_host.cache_clear()
+
+        @classmethod
+        def sites(cls) -> list[str]:
+            return sorted(cls._suffixes)
+
+        @classmethod
+        @lru_cache(maxsize=4096)
+        def site_of_host(cls, host: str) -> str | None:
+            """The most specific whitelisted site `host` belongs to, or None if it isn't supported."""
+            # A site matches itself and its subdomains: one set lookup per label of the host, however long
+            # the whitelist is.
+            labels = host.lower().rstrip(".").split(".")
+            for i in range(len(labels)):
+                suffix = ".".join(labels[i:])
+                if suffix in cls._suffixes:
+                    return suffix
+            return None
+
+        @classmethod
+        def is_host_supported(cls, host: str) -> bool:
+            return cls.site_of_host(host) is not None
+
         @classmethod
         def is_supported(cls, url: str) -> bool:
-            return any(site in url for site in cls.WHITELIST)
+            try:
+                host = urlsplit(url).hostname
+            except ValueError:
+                # Malformed, e.g. an unterminated IPv6 host
+                return False
+            return cls.is_host_supported(host or "")
+
 
+Config.SupportedSites.load()
 
 config = Config()
@@ -1,9 +1,16 @@
 import os
+import time
+from typing import Any, AsyncIterator
 
-import databases
 from dotenv import load_dotenv
-from sqlalchemy import MetaData, create_engine
+from sqlalchemy import create_engine
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
+
+from app.metrics import record_pool_wait
 
 load_dotenv()
 
@@ -14,19 +21,128 @@ POSTGRES_HOST = os.getenv("POSTGRES_HOST")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT")
 
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+# Open a fresh connection per checkout instead of pooling, e.g. behind pgbouncer, or when every caller
+# runs its own event loop (asyncpg connections can't move between loops).
+DB_NULL_POOL = os.getenv("DB_NULL_POOL", "false").lower() == "true"
+# Number of prepared statements asyncpg keeps per connection
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+# Pool sizing, per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds after which a connection is replaced, so none outlive a failover for long (-1 disables)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test connections on checkout and transparently replace dead ones
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side statement_timeout in milliseconds (0 disables)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+class _TimedQueue(AsyncAdaptedQueue):
+    """The pool's queue of idle connections, reporting to the pool how long each blocking get waits."""
+
+    pool: "InstrumentedQueuePool"
+
+    def get(self, block: bool = True, timeout: float | None = None) -> Any:
+        if not block:
+            return super().get(block, timeout)
+        self.pool.waiting += 1
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            self.pool.waiting -= 1
+            self.pool._record_wait(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that also records how many callers wait for a connection and for how long.
+
+    Only the time spent blocked on the queue of idle connections counts as waiting: opening a new connection
+    when the pool has room is connect latency, not pool contention.
+    """
 
-database = databases.Database(DATABASE_URL)
-metadata = MetaData()
+    _queue_class = _TimedQueue
 
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        assert isinstance(self._pool, _TimedQueue)
+        self._pool.pool = self
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+
+    def _record_wait(self, waited: float) -> None:
+        self.checkout_wait_seconds_total += waited
+        self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, waited)
+        record_pool_wait(waited)
+
+    def _do_get(self):
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            self.checkouts += 1
+
+
+# Sync engine for migrations, maintenance scripts and tests. The app only talks to the async engine, and
+# this one doesn't open a connection until it is first used.
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+pool_options: dict[str, Any] = {"poolclass": NullPool}
+if not DB_NULL_POOL:
+    pool_options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+connect_args: dict[str, Any] = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+if DB_STATEMENT_TIMEOUT_MS > 0:
+    # Only when set, so a statement_timeout configured on the role or database applies otherwise
+    connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=connect_args,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    **pool_options,
+)
+# Instances stay loaded after commit: lazy refreshes aren't possible on an async session.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def get_pool_stats() -> dict[str, Any]:
+    pool = async_engine.pool
+    stats: dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            waiting=pool.waiting,
+            checkouts=pool.checkouts,
+            checkout_timeouts=pool.checkout_timeouts,
+            checkout_wait_seconds_total=pool.checkout_wait_seconds_total,
+            checkout_wait_seconds_max=pool.checkout_wait_seconds_max,
+        )
+    return stats
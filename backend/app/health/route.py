@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+
+from app.articles.cache import read_state_cache
+from app.db import get_pool_stats
+from app.metrics import render_metrics
 
 router = APIRouter()
 
@@ -6,3 +10,19 @@ router = APIRouter()
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@router.get("/health/pool")
+async def pool_stats():
+    return get_pool_stats()
+
+
+@router.get("/health/cache")
+async def cache_stats():
+    return read_state_cache.stats()
+
+
+@router.get("/metrics", response_class=Response)
+async def metrics():
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
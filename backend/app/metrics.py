@@ -0,0 +1,150 @@
+"""Per-route request metrics in the Prometheus format, served by GET /metrics.
+
+For every HTTP request, `MetricsMiddleware` records, labelled by method and route template:
+- the request latency
+- the number of SQL statements sent
+- the time spent waiting on them
+- the time spent waiting for a pooled connection
+
+Queries are counted by cursor execution hooks on the engine (`instrument_engine`) and pool waits by
+app.db.InstrumentedQueuePool, both into the metrics of the request being served, found through a context
+variable.
+
+Each worker keeps its own metrics. With several workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+shared by all of them (and cleared on deploy): each worker then writes to its own files there without
+locking against the others, and /metrics, whichever worker serves it, merges them all.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Requests that match no route share one label, so scanners can't blow up the number of series
+UNMATCHED_ROUTE = "unmatched"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 50)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve a request, including streaming its body",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements sent per request",
+    ["method", "route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Time per request spent executing SQL statements",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_POOL_WAIT = Histogram(
+    "http_request_db_pool_wait_seconds",
+    "Time per request spent waiting to check out a database connection",
+    ["method", "route"],
+    buckets=POOL_WAIT_BUCKETS,
+)
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    db_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+
+
+_current_request: ContextVar[RequestMetrics | None] = ContextVar("current_request_metrics", default=None)
+
+
+def record_pool_wait(seconds: float) -> None:
+    metrics = _current_request.get()
+    if metrics is not None:
+        metrics.pool_wait_seconds += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    metrics = _current_request.get()
+    started = getattr(context, "_metrics_started", None)
+    if metrics is not None and started is not None:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count the statements `engine` (the sync engine behind an async one) executes towards the metrics of
+    the request they run for."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording REQUEST_* metrics for every HTTP request."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = _current_request.set(metrics)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            latency = time.perf_counter() - started
+            _current_request.reset(token)
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+            REQUEST_LATENCY.labels(*labels, str(status)).observe(latency)
+            REQUEST_QUERIES.labels(*labels).observe(metrics.queries)
+            REQUEST_DB_TIME.labels(*labels).observe(metrics.db_seconds)
+            REQUEST_POOL_WAIT.labels(*labels).observe(metrics.pool_wait_seconds)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """All metrics in the Prometheus text format, merged across workers in multiprocess mode, and the
+    content type to serve them as."""
+    if os.getenv(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
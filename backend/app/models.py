@@ -1,16 +1,48 @@
 import uuid
-from datetime import datetime
+from datetime import UTC, date, datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    TypeDecorator,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
 
 
+class UTCDateTime(TypeDecorator):
+    """Naive UTC timestamp column that also accepts timezone-aware datetimes.
+
+    asyncpg refuses aware datetimes for `TIMESTAMP WITHOUT TIME ZONE`, so they are converted to UTC and
+    stripped of their offset before binding.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(UTC).replace(tzinfo=None)
+        return value
+
+
 class User(Base):
     __tablename__ = "users"
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     email: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=True)
+    # Bumped by every write to the user's articles; drives ETags on article listings
+    articles_version: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    # Denormalized article counters, maintained alongside articles_version (see app.user.counters)
+    article_count: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    read_count: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
 
     # Relationships
     articles: Mapped[list["Article"]] = relationship("Article", back_populates="user")
@@ -19,14 +51,81 @@ class User(Base):
 class Article(Base):
     __tablename__ = "articles"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    url: Mapped[str] = mapped_column(String, index=True)
-    date_first_accessed: Mapped[datetime] = mapped_column(DateTime, nullable=True)
-    date_last_accessed: Mapped[datetime] = mapped_column(DateTime, nullable=True)
-    date_read: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Canonical URL (see app.articles.urls) and its 64-bit hash, which is what lookups go through
+    url: Mapped[str] = mapped_column(String)
+    url_hash: Mapped[int] = mapped_column(BigInteger)
+    date_first_accessed: Mapped[datetime] = mapped_column(UTCDateTime, nullable=True)
+    date_last_accessed: Mapped[datetime] = mapped_column(UTCDateTime, nullable=True)
+    date_read: Mapped[datetime | None] = mapped_column(UTCDateTime, nullable=True)
+    # When the read state was last set, by the clock of whoever set it; later changes win (see app.articles.sync)
+    read_state_at: Mapped[datetime | None] = mapped_column(UTCDateTime, nullable=True)
     user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"))
+    # The user's articles_version as of the last write to this row; drives GET /articles/changes
+    change_version: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
 
     # Relationships
     user: Mapped["User"] = relationship("User", back_populates="articles")
 
     # Constraints
-    __table_args__ = (UniqueConstraint("url", "user_id", name="_url_user_uc"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "url_hash", name="_user_url_hash_uc"),
+        # Keyset pagination over (date_last_accessed DESC, id DESC), scanned backwards
+        Index("ix_articles_user_last_accessed", "user_id", "date_last_accessed", "id"),
+        Index(
+            "ix_articles_user_unread_last_accessed",
+            "user_id",
+            "date_last_accessed",
+            "id",
+            postgresql_where=text("date_read IS NULL"),
+        ),
+        # Delta sync: a user's rows in change order
+        Index("ix_articles_user_change_version", "user_id", "change_version", "id"),
+    )
+
+
+class ArticleEventReceipt(Base):
+    """Idempotency keys of client events already applied by POST /articles/events, so replays are no-ops.
+    Pruned by app.articles.rollup."""
+
+    __tablename__ = "article_event_receipts"
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    event_id: Mapped[str] = mapped_column(String, primary_key=True)
+    received_at: Mapped[datetime] = mapped_column(UTCDateTime, index=True)
+
+
+class ArticleAccessEvent(Base):
+    """One row per article visit. Append-only: written in batches by app.articles.history, compacted into
+    ArticleAccessDaily and pruned by app.articles.rollup."""
+
+    __tablename__ = "article_access_events"
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    # Deliberately no foreign keys, so inserts stay cheap
+    user_id: Mapped[str] = mapped_column(String)
+    article_id: Mapped[int] = mapped_column(Integer)
+    accessed_at: Mapped[datetime] = mapped_column(UTCDateTime)
+
+    __table_args__ = (
+        # Rows arrive roughly in time order, so a tiny BRIN index serves the rollup's and pruning's range scans
+        Index("ix_article_access_events_accessed_at", "accessed_at", postgresql_using="brin"),
+    )
+
+
+class ArticleAccessDaily(Base):
+    """Article visits per user, UTC day and host."""
+
+    __tablename__ = "article_access_daily"
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    host: Mapped[str] = mapped_column(String, primary_key=True)
+    accesses: Mapped[int] = mapped_column(BigInteger)
+    # Visits after the one that first tracked the article
+    revisits: Mapped[int] = mapped_column(BigInteger)
+
+
+class ArticleAccessRollupState(Base):
+    """Progress of app.articles.rollup: every visit with an id up to `last_event_id` is counted in
+    ArticleAccessDaily. A single row."""
+
+    __tablename__ = "article_access_rollup_state"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    last_event_id: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
@@ -1,21 +1,22 @@
+import asyncio
 import os
-from contextlib import asynccontextmanager
+import signal
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.articles.history import access_event_log
 from app.articles.route import router as article_router
-from app.db import Base, database, engine
+from app.articles.writebehind import access_coalescer
+from app.compression import GZipMiddleware
+from app.config import Config
+from app.db import AsyncSessionLocal, Base, async_engine
 from app.health.route import router as health_router
-from app.models import Article, User  # noqa: F401
+from app.metrics import MetricsMiddleware, instrument_engine
+from app.models import Article, ArticleAccessDaily, ArticleAccessEvent, User  # noqa: F401
 from app.user.route import router as user_router
 
-################################################################################
-## DATABASE ##
-################################################################################
-
-Base.metadata.create_all(bind=engine)
-
 ################################################################################
 ## APP LIFECYCLE ##
 ################################################################################
@@ -25,9 +26,32 @@ app = FastAPI()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await database.connect()
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # `kill -HUP <worker>` picks up changes to the supported sites without a restart (main thread, POSIX only)
+    with suppress(NotImplementedError, RuntimeError):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, Config.SupportedSites.load)
+
+    flush_task = asyncio.create_task(access_coalescer.run(AsyncSessionLocal)) if access_coalescer.enabled else None
+    history_task = asyncio.create_task(access_event_log.run(AsyncSessionLocal)) if access_event_log.enabled else None
+
     yield
-    await database.disconnect()
+
+    if flush_task:
+        flush_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await flush_task
+        # Already logged; shutting down goes on either way
+        with suppress(Exception):
+            await access_coalescer.flush(AsyncSessionLocal)
+    if history_task:
+        history_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await history_task
+        with suppress(Exception):
+            await access_event_log.flush(AsyncSessionLocal)
+    await async_engine.dispose()
 
 
 app.router.lifespan_context = lifespan
@@ -68,8 +92,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Bloom-Bits", "X-Bloom-Hashes"],
 )
 
+# Compress responses of at least this many bytes for clients that accept gzip (0 disables); their ETags are
+# made weak, as the compressed bytes differ from the uncompressed ones
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+if GZIP_MIN_BYTES > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
+
+# Outermost, so latencies include every other middleware
+app.add_middleware(MetricsMiddleware)
+instrument_engine(async_engine.sync_engine)
+
 ################################################################################
 ## ROUTERS ##
 ################################################################################
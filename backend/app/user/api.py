@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel
 
 from app.articles.api import ArticleResponse
 
@@ -11,6 +11,13 @@ class UserRequest(BaseModel):
 class UserResponse(BaseModel):
     id: str
     email: str | None = None
-    articles: list[ArticleResponse] = []
+    article_count: int = 0
+    read_count: int = 0
+    # Only present when requested with `include_articles`, most recently accessed first
+    articles: list[ArticleResponse] | None = None
 
-    model_config = ConfigDict(from_attributes=True)
+
+class UserStats(BaseModel):
+    article_count: int
+    read_count: int
+    unread_count: int
@@ -0,0 +1,93 @@
+"""Reconcile the denormalized article counters on `users` with the articles table.
+
+    python -m app.user.counters          # report users whose counters drifted
+    python -m app.user.counters --fix    # ... and correct them
+
+Counters are maintained in the same transaction as every article write, so drift means a bug or a manual
+edit. Run --fix when writes are quiet: a write that lands while the recount runs can be overwritten.
+"""
+
+import argparse
+from dataclasses import dataclass
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models import Article, User
+
+
+@dataclass
+class CounterDrift:
+    user_id: str
+    article_count: int
+    read_count: int
+    actual_article_count: int
+    actual_read_count: int
+
+
+def reconcile_counters(db: Session, fix: bool = False) -> list[CounterDrift]:
+    """Recount every user's articles in one pass and return the users whose counters differ. With `fix`, the
+    counters are corrected in the same statement; the caller commits."""
+    actual = (
+        select(
+            User.id.label("user_id"),
+            func.count(Article.id).label("article_count"),
+            func.count(Article.date_read).label("read_count"),
+        )
+        .outerjoin(Article, Article.user_id == User.id)
+        .group_by(User.id)
+        .subquery()
+    )
+    drifted = or_(User.article_count != actual.c.article_count, User.read_count != actual.c.read_count)
+
+    if fix:
+        # Joining a second copy of users lets RETURNING report the counters as they were before the update
+        users = User.__table__
+        before = users.alias("before")
+        rows = db.execute(
+            update(users)
+            .where(users.c.id == actual.c.user_id, before.c.id == users.c.id, drifted)
+            .values(article_count=actual.c.article_count, read_count=actual.c.read_count)
+            .returning(
+                users.c.id,
+                before.c.article_count,
+                before.c.read_count,
+                actual.c.article_count.label("actual_article_count"),
+                actual.c.read_count.label("actual_read_count"),
+            )
+        )
+    else:
+        rows = db.execute(
+            select(
+                User.id,
+                User.article_count,
+                User.read_count,
+                actual.c.article_count.label("actual_article_count"),
+                actual.c.read_count.label("actual_read_count"),
+            )
+            .join(actual, actual.c.user_id == User.id)
+            .where(drifted)
+        )
+    return sorted((CounterDrift(*row) for row in rows), key=lambda drift: drift.user_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fix", action="store_true", help="correct drifted counters")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        drifts = reconcile_counters(db, fix=args.fix)
+        db.commit()
+
+    for drift in drifts:
+        print(
+            f"{drift.user_id}: articles {drift.article_count} -> {drift.actual_article_count}, "
+            f"read {drift.read_count} -> {drift.actual_read_count}"
+        )
+    print(f"{len(drifts)} user(s) {'fixed' if args.fix else 'drifted'}")
+
+
+if __name__ == "__main__":
+    main()
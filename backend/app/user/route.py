@@ -1,32 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.articles.api import ArticleResponse
+from app.config import Config
 from app.db import get_db
-from app.models import User
+from app.models import Article, User
 
-from .api import UserRequest, UserResponse
+from .api import UserRequest, UserResponse, UserStats
 
 router = APIRouter()
 
 
+async def _recent_articles(db: AsyncSession, user_id: str, limit: int) -> list[ArticleResponse]:
+    articles = await db.scalars(
+        select(Article)
+        .where(Article.user_id == user_id)
+        .order_by(Article.date_last_accessed.desc(), Article.id.desc())
+        .limit(limit)
+    )
+    return [ArticleResponse.model_validate(article) for article in articles]
+
+
 @router.post("/user/register", response_model=UserResponse)
-def register_user(user: UserRequest, db: Session = Depends(get_db)):
-    if user.email:
-        existing_user = db.query(User).filter(User.email == user.email).first()
-        if existing_user:
-            raise HTTPException(status_code=400, detail="User with this email already exists")
-    db_user = User(email=user.email) if user.email else User(id=user.uuid)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+async def register_user(
+    user: UserRequest,
+    include_articles: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+):
+    values = {"email": user.email} if user.email else {"id": user.uuid} if user.uuid else {}
+    # A single round trip: an existing email (or id) makes the insert a no-op instead of racing a lookup
+    db_user = await db.scalar(insert(User).values(**values).on_conflict_do_nothing().returning(User))
+    if db_user is None:
+        field = "email" if user.email else "id"
+        raise HTTPException(status_code=400, detail=f"User with this {field} already exists")
+    await db.commit()
+    # A new user has no articles yet
+    return UserResponse(id=db_user.id, email=db_user.email, articles=[] if include_articles else None)
 
 
 @router.post("/user/login", response_model=UserResponse)
-def login_user(user: UserRequest, db: Session = Depends(get_db)):
+async def login_user(
+    user: UserRequest,
+    include_articles: bool = Query(False),
+    articles_limit: int = Query(Config.Users.ARTICLES_LIMIT_DEFAULT, ge=1, le=Config.Users.ARTICLES_LIMIT_MAX),
+    db: AsyncSession = Depends(get_db),
+):
     if not user.email:
         raise HTTPException(status_code=400, detail="Email is required")
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if not db_user:
+    row = (
+        await db.execute(
+            select(User.id, User.email, User.article_count, User.read_count).where(User.email == user.email)
+        )
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_id, email, article_count, read_count = row
+    return UserResponse(
+        id=user_id,
+        email=email,
+        article_count=article_count,
+        read_count=read_count,
+        articles=await _recent_articles(db, user_id, articles_limit) if include_articles else None,
+    )
+
+
+@router.get("/user/stats", response_model=UserStats)
+async def get_user_stats(user_id: str = Header(None, alias="User-Id"), db: AsyncSession = Depends(get_db)):
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User ID is required")
+    row = (await db.execute(select(User.article_count, User.read_count).where(User.id == user_id))).first()
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+    article_count, read_count = row
+    return UserStats(article_count=article_count, read_count=read_count, unread_count=article_count - read_count)
@@ -0,0 +1,359 @@
+"""Load test for the article endpoints against a database seeded with synthetic users and articles.
+
+Run from backend/, with the usual POSTGRES_* variables pointing at a scratch database:
+
+    python -m benchmarks.bench_endpoints seed --users 1000 --articles-per-user 10000
+    python app/main.py &
+    python -m benchmarks.bench_endpoints run --concurrency 32 --duration 30 --output after.json
+
+`run` drives POST /articles/access, GET /articles/?url=, GET /articles/all and PATCH /articles/{id}/read
+with concurrent clients, in proportions set by `--mix`, and writes a JSON report: per endpoint, requests,
+errors, throughput and p50/p95/p99 latency, next to the settings and git commit of the run, so reports from
+two commits can be diffed. `--in-process` serves the app from the benchmark's own event loop instead of
+over the network, for a quick run without a server; client and server then share a core, so absolute
+numbers are lower.
+
+Seeded users are named `bench-<n>`; `seed --reset` deletes them (and their articles) first, and leaves
+every other row alone.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+import httpx
+from sqlalchemy import text
+
+from app.articles.urls import url_hash
+from app.db import Base, engine
+from app.models import Article, User  # noqa: F401
+
+BENCH_USER_PREFIX = "bench-"
+BENCH_SITE = "https://www.economist.com/bench"
+# Articles written per COPY round trip while seeding
+SEED_CHUNK_ROWS = 100_000
+
+DEFAULT_MIX = "access=4,lookup=4,all=1,read=1"
+
+
+def bench_user_id(user_index: int) -> str:
+    return f"{BENCH_USER_PREFIX}{user_index:08d}"
+
+
+def bench_url(user_index: int, article_index: int) -> str:
+    # Already canonical, so the hash matches what the endpoints compute
+    return f"{BENCH_SITE}/{user_index}/{article_index}"
+
+
+def _copy_value(value: Any) -> str:
+    return r"\N" if value is None else str(value)
+
+
+def _copy(cursor: Any, table: str, columns: tuple[str, ...], rows: list[tuple]) -> None:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def seed(users: int, articles_per_user: int, read_fraction: float, seed_value: int, reset: bool) -> None:
+    """COPY `users` × `articles_per_user` synthetic articles in, with the users' counters to match."""
+    Base.metadata.create_all(engine)
+    rng = random.Random(seed_value)
+    now = datetime.now(UTC).replace(tzinfo=None, microsecond=0)
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if reset:
+            for table in ("articles", "users"):
+                column = "user_id" if table == "articles" else "id"
+                cursor.execute(f"DELETE FROM {table} WHERE {column} LIKE %s", (f"{BENCH_USER_PREFIX}%",))
+            connection.commit()
+
+        started = time.perf_counter()
+        article_rows: list[tuple] = []
+        user_rows: list[tuple] = []
+        written = 0
+        for user_index in range(users):
+            user_id = bench_user_id(user_index)
+            read_count = 0
+            for article_index in range(articles_per_user):
+                url = bench_url(user_index, article_index)
+                first = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+                last = first + timedelta(seconds=rng.randrange(int((now - first).total_seconds()) + 1))
+                date_read = None
+                if rng.random() < read_fraction:
+                    date_read = last
+                    read_count += 1
+                article_rows.append((url, url_hash(url), user_id, first, last, date_read, date_read))
+            user_rows.append((user_id, articles_per_user, read_count))
+
+            if len(article_rows) >= SEED_CHUNK_ROWS or user_index == users - 1:
+                # Users first: articles reference them
+                _copy(cursor, "users", ("id", "article_count", "read_count"), user_rows)
+                _copy(
+                    cursor,
+                    "articles",
+                    (
+                        "url",
+                        "url_hash",
+                        "user_id",
+                        "date_first_accessed",
+                        "date_last_accessed",
+                        "date_read",
+                        "read_state_at",
+                    ),
+                    article_rows,
+                )
+                connection.commit()
+                written += len(article_rows)
+                article_rows, user_rows = [], []
+                rate = written / (time.perf_counter() - started)
+                print(f"Seeded {user_index + 1}/{users} users, {written} articles ({rate:.0f}/s)", file=sys.stderr)
+
+        cursor.execute("ANALYZE users")
+        cursor.execute("ANALYZE articles")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+@dataclass
+class Target:
+    user_id: str
+    article_id: int
+    url: str
+
+
+def sample_targets(size: int) -> list[Target]:
+    """A random sample of seeded articles to aim requests at, without scanning the whole table."""
+    with engine.connect() as connection:
+        estimate = connection.scalar(text("SELECT reltuples FROM pg_class WHERE relname = 'articles'")) or 0
+        # Sample ten times more pages' worth than needed: bench rows may share the table with others
+        percent = min(100.0, 100.0 * size * 10 / max(estimate, 1))
+        rows = connection.execute(
+            text(
+                f"SELECT user_id, id, url FROM articles TABLESAMPLE SYSTEM ({percent}) "
+                "WHERE user_id LIKE :prefix ORDER BY random() LIMIT :size"
+            ),
+            {"prefix": f"{BENCH_USER_PREFIX}%", "size": size},
+        )
+        return [Target(user_id, article_id, url) for user_id, article_id, url in rows]
+
+
+Request = Callable[[httpx.AsyncClient, Target, random.Random], Awaitable[httpx.Response]]
+
+
+def _access(client: httpx.AsyncClient, target: Target, rng: random.Random) -> Awaitable[httpx.Response]:
+    return client.post(
+        "/articles/access",
+        json={"url": target.url, "create_if_not_exist": True},
+        headers={"User-Id": target.user_id},
+    )
+
+
+def _lookup(client: httpx.AsyncClient, target: Target, rng: random.Random) -> Awaitable[httpx.Response]:
+    return client.get("/articles/", params={"url": target.url}, headers={"User-Id": target.user_id})
+
+
+def _all(client: httpx.AsyncClient, target: Target, rng: random.Random) -> Awaitable[httpx.Response]:
+    return client.get("/articles/all", headers={"User-Id": target.user_id})
+
+
+def _read(client: httpx.AsyncClient, target: Target, rng: random.Random) -> Awaitable[httpx.Response]:
+    return client.patch(
+        f"/articles/{target.article_id}/read",
+        json={"read": rng.random() < 0.5},
+        headers={"User-Id": target.user_id},
+    )
+
+
+ENDPOINTS: dict[str, Request] = {"access": _access, "lookup": _lookup, "all": _all, "read": _read}
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+@dataclass
+class EndpointSamples:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+
+def summarize(samples: EndpointSamples, duration: float) -> dict[str, Any]:
+    """Request and error counts, throughput and latency percentiles (in milliseconds) of one endpoint."""
+    latencies = samples.latencies
+    summary: dict[str, Any] = {
+        "requests": len(latencies),
+        "errors": samples.errors,
+        "throughput_rps": round(len(latencies) / duration, 1) if duration else 0.0,
+    }
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        summary["latency_ms"] = {
+            "p50": round(cuts[49] * 1000, 3),
+            "p95": round(cuts[94] * 1000, 3),
+            "p99": round(cuts[98] * 1000, 3),
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        }
+    return summary
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    targets: list[Target],
+    weights: dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed_value: int,
+) -> dict[str, EndpointSamples]:
+    """Send requests from `concurrency` clients for `warmup` + `duration` seconds, keeping samples of
+    requests that started after the warmup."""
+    samples = {name: EndpointSamples() for name in weights}
+    names, name_weights = list(weights), list(weights.values())
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def worker(worker_index: int) -> None:
+        rng = random.Random(seed_value + worker_index)
+        while (started := time.perf_counter()) < deadline:
+            name = rng.choices(names, name_weights)[0]
+            try:
+                response = await ENDPOINTS[name](client, rng.choice(targets), rng)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if started >= measure_from:
+                if failed:
+                    samples[name].errors += 1
+                else:
+                    samples[name].latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return samples
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(
+    base_url: str,
+    in_process: bool,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    mix: str,
+    sample_size: int,
+    seed_value: int,
+) -> dict[str, Any]:
+    weights = parse_mix(mix)
+    targets = sample_targets(sample_size)
+    if not targets:
+        raise SystemExit("No seeded articles found, run `python -m benchmarks.bench_endpoints seed` first")
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if in_process:
+        from app.server import app
+
+        # httpx's ASGI app type is narrower than Starlette's signature, though the two are compatible
+        transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits)
+    else:
+        client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30)
+    async with client:
+        samples = await drive(client, targets, weights, concurrency, duration, warmup, seed_value)
+
+    total = EndpointSamples(
+        latencies=[latency for endpoint in samples.values() for latency in endpoint.latencies],
+        errors=sum(endpoint.errors for endpoint in samples.values()),
+    )
+    return {
+        "commit": _git_commit(),
+        "settings": {
+            "base_url": None if in_process else base_url,
+            "concurrency": concurrency,
+            "duration_seconds": duration,
+            "warmup_seconds": warmup,
+            "mix": weights,
+            "targets": len(targets),
+        },
+        "endpoints": {name: summarize(endpoint, duration) for name, endpoint in samples.items()},
+        "total": summarize(total, duration),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="insert synthetic users and articles")
+    seed_parser.add_argument("--users", type=int, default=100)
+    seed_parser.add_argument("--articles-per-user", type=int, default=1000)
+    seed_parser.add_argument("--read-fraction", type=float, default=0.3)
+    seed_parser.add_argument("--seed", type=int, default=0)
+    seed_parser.add_argument("--reset", action="store_true", help="delete previously seeded users first")
+
+    run_parser = commands.add_parser("run", help="drive the endpoints and report latencies as JSON")
+    run_parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run_parser.add_argument("--in-process", action="store_true", help="serve the app in-process, no server")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    run_parser.add_argument("--warmup", type=float, default=5, help="seconds of unmeasured load first")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help="relative weights of access, lookup, all, read")
+    run_parser.add_argument("--sample-size", type=int, default=10_000, help="seeded articles to target")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="write the report here instead of stdout")
+
+    args = parser.parse_args()
+    if args.command == "seed":
+        seed(args.users, args.articles_per_user, args.read_fraction, args.seed, args.reset)
+        return
+
+    report = asyncio.run(
+        run(
+            args.base_url,
+            args.in_process,
+            args.concurrency,
+            args.duration,
+            args.warmup,
+            args.mix,
+            args.sample_size,
+            args.seed,
+        )
+    )
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
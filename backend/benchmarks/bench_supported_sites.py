@@ -0,0 +1,39 @@
+"""Micro-benchmark for Config.SupportedSites.is_supported as the whitelist grows.
+
+Run from backend/ with `python -m benchmarks.bench_supported_sites`. The per-call cost should stay flat from
+tens to thousands of whitelisted sites, both for repeat hosts (served from the LRU cache) and for hosts that
+miss it.
+"""
+
+import timeit
+from unittest import mock
+
+from app.config import Config
+
+SIZES = [10, 100, 1_000, 10_000]
+CALLS = 20_000
+
+
+def bench(size: int) -> tuple[float, float]:
+    sites = Config.SupportedSites
+    whitelist = [f"site{i}.example.com" for i in range(size)] + sites.WHITELIST
+    with mock.patch.object(sites, "WHITELIST", whitelist):
+        sites.load()
+        url = "https://www.economist.com/business/2024/07/18/some-story"
+        cached = timeit.timeit(lambda: sites.is_supported(url), number=CALLS) / CALLS
+
+        urls = iter([f"https://host{i}.site{i % size}.example.com/story" for i in range(CALLS)])
+        uncached = timeit.timeit(lambda: sites.is_supported(next(urls)), number=CALLS) / CALLS
+    sites.load()
+    return cached, uncached
+
+
+def main() -> None:
+    print(f"{'sites':>8} {'cached (us)':>12} {'uncached (us)':>14}")
+    for size in SIZES:
+        cached, uncached = bench(size)
+        print(f"{size:>8} {cached * 1e6:>12.2f} {uncached * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
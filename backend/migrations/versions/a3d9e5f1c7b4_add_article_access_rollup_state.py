@@ -0,0 +1,36 @@
+"""add_article_access_rollup_state
+
+Revision ID: a3d9e5f1c7b4
+Revises: e9f3a6b2d8c5
+Create Date: 2024-10-02 10:47:18.216390
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3d9e5f1c7b4"
+down_revision: Union[str, None] = "e9f3a6b2d8c5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "article_access_rollup_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("last_event_id", sa.BigInteger(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Visits already there were rolled up by earlier runs, as far as anyone can tell
+    op.execute(
+        "INSERT INTO article_access_rollup_state (id, last_event_id) "
+        "SELECT 1, coalesce(max(id), 0) FROM article_access_events"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("article_access_rollup_state")
@@ -0,0 +1,95 @@
+"""canonicalize_article_urls
+
+Revision ID: a7c3e9f1b5d2
+Revises: f2a6b9d4c1e8
+Create Date: 2024-09-10 09:31:27.804412
+
+"""
+
+from itertools import groupby
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import text
+
+from app.articles.urls import canonicalize_url, url_hash
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c3e9f1b5d2"
+down_revision: Union[str, None] = "f2a6b9d4c1e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def _merge(rows: list) -> dict:
+    """Fold rows that canonicalize to the same URL into the oldest one."""
+    dates_first = [row.date_first_accessed for row in rows if row.date_first_accessed]
+    dates_last = [row.date_last_accessed for row in rows if row.date_last_accessed]
+    dates_read = [row.date_read for row in rows if row.date_read]
+    return {
+        "article_id": rows[0].id,
+        "date_first_accessed": min(dates_first, default=None),
+        "date_last_accessed": max(dates_last, default=None),
+        "date_read": max(dates_read, default=None),
+    }
+
+
+def upgrade() -> None:
+    op.add_column("articles", sa.Column("url_hash", sa.BigInteger(), nullable=True))
+
+    bind = op.get_bind()
+    update_url = text("UPDATE articles SET url = :url, url_hash = :url_hash WHERE id = :article_id")
+    update_dates = text(
+        "UPDATE articles SET date_first_accessed = :date_first_accessed, date_last_accessed = :date_last_accessed, "
+        "date_read = :date_read WHERE id = :article_id"
+    )
+    delete_article = text("DELETE FROM articles WHERE id = :article_id")
+
+    # The unique constraint moves to the hash below, so canonical URLs may briefly repeat per user
+    op.drop_constraint("_url_user_uc", "articles", type_="unique")
+
+    # Streamed per user (a server-side cursor), with writes flushed in batches as they accumulate
+    rows = bind.execute(
+        text(
+            "SELECT id, user_id, url, date_first_accessed, date_last_accessed, date_read "
+            "FROM articles ORDER BY user_id, id"
+        ).execution_options(yield_per=BATCH_SIZE)
+    )
+
+    pending: dict[sa.TextClause, list[dict]] = {delete_article: [], update_url: [], update_dates: []}
+
+    def flush(force: bool = False) -> None:
+        for statement, params in pending.items():
+            if params and (force or len(params) >= BATCH_SIZE):
+                bind.execute(statement, params)
+                params.clear()
+
+    for _, user_rows in groupby(rows, key=lambda row: row.user_id):
+        by_url: dict[str, list] = {}
+        for row in user_rows:
+            by_url.setdefault(canonicalize_url(row.url), []).append(row)
+
+        for canonical_url, duplicates in by_url.items():
+            pending[update_url].append(
+                {"article_id": duplicates[0].id, "url": canonical_url, "url_hash": url_hash(canonical_url)}
+            )
+            if len(duplicates) > 1:
+                pending[update_dates].append(_merge(duplicates))
+                pending[delete_article].extend({"article_id": row.id} for row in duplicates[1:])
+        flush()
+    flush(force=True)
+
+    op.alter_column("articles", "url_hash", existing_type=sa.BigInteger(), nullable=False)
+    op.create_unique_constraint("_user_url_hash_uc", "articles", ["user_id", "url_hash"])
+    # Lookups go through the hash now
+    op.drop_index("ix_articles_url", table_name="articles")
+
+
+def downgrade() -> None:
+    op.create_index("ix_articles_url", "articles", ["url"], unique=False)
+    op.drop_constraint("_user_url_hash_uc", "articles", type_="unique")
+    op.create_unique_constraint("_url_user_uc", "articles", ["url", "user_id"])
+    op.drop_column("articles", "url_hash")
@@ -0,0 +1,38 @@
+"""add_users_article_counters
+
+Revision ID: b8d4f0a2c6e3
+Revises: a7c3e9f1b5d2
+Create Date: 2024-09-12 11:05:41.228093
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b8d4f0a2c6e3"
+down_revision: Union[str, None] = "a7c3e9f1b5d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("article_count", sa.BigInteger(), server_default="0", nullable=False))
+    op.add_column("users", sa.Column("read_count", sa.BigInteger(), server_default="0", nullable=False))
+    op.execute(
+        """
+        UPDATE users SET article_count = counts.article_count, read_count = counts.read_count
+        FROM (
+            SELECT user_id, count(*) AS article_count, count(date_read) AS read_count
+            FROM articles GROUP BY user_id
+        ) AS counts
+        WHERE users.id = counts.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "read_count")
+    op.drop_column("users", "article_count")
@@ -0,0 +1,51 @@
+"""add_article_access_history
+
+Revision ID: c2e7a4d9f3b1
+Revises: b8d4f0a2c6e3
+Create Date: 2024-09-16 14:22:09.671835
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c2e7a4d9f3b1"
+down_revision: Union[str, None] = "b8d4f0a2c6e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "article_access_events",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("article_id", sa.Integer(), nullable=False),
+        sa.Column("accessed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_article_access_events_accessed_at",
+        "article_access_events",
+        ["accessed_at"],
+        unique=False,
+        postgresql_using="brin",
+    )
+    op.create_table(
+        "article_access_daily",
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("host", sa.String(), nullable=False),
+        sa.Column("accesses", sa.BigInteger(), nullable=False),
+        sa.Column("revisits", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "day", "host"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("article_access_daily")
+    op.drop_index("ix_article_access_events_accessed_at", table_name="article_access_events", postgresql_using="brin")
+    op.drop_table("article_access_events")
@@ -0,0 +1,38 @@
+"""add_articles_change_version
+
+Revision ID: d5b1c8e2a7f4
+Revises: c2e7a4d9f3b1
+Create Date: 2024-09-19 10:37:52.140266
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5b1c8e2a7f4"
+down_revision: Union[str, None] = "c2e7a4d9f3b1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows stay at version 0: they all come through a client's first (cursorless) sync
+    op.add_column("articles", sa.Column("change_version", sa.BigInteger(), server_default="0", nullable=False))
+
+    # Build without blocking article writes on large tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_articles_user_change_version",
+            "articles",
+            ["user_id", "change_version", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_articles_user_change_version", table_name="articles", postgresql_concurrently=True)
+    op.drop_column("articles", "change_version")
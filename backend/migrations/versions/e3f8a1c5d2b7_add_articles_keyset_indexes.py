@@ -0,0 +1,52 @@
+"""add_articles_keyset_indexes
+
+Revision ID: e3f8a1c5d2b7
+Revises: c4bd2582494f
+Create Date: 2024-09-02 10:12:41.318204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import text
+
+# revision identifiers, used by Alembic.
+revision: str = "e3f8a1c5d2b7"
+down_revision: Union[str, None] = "c4bd2582494f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination compares (date_last_accessed, id) tuples, which never match NULLs
+    op.execute(
+        text(
+            "UPDATE articles SET date_last_accessed = COALESCE(date_first_accessed, date_read, now()) "
+            "WHERE date_last_accessed IS NULL"
+        )
+    )
+    op.execute(text("UPDATE articles SET date_first_accessed = date_last_accessed WHERE date_first_accessed IS NULL"))
+
+    # Build without blocking article writes on large tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_articles_user_last_accessed",
+            "articles",
+            ["user_id", "date_last_accessed", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_articles_user_unread_last_accessed",
+            "articles",
+            ["user_id", "date_last_accessed", "id"],
+            postgresql_where=sa.text("date_read IS NULL"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_articles_user_unread_last_accessed", table_name="articles", postgresql_concurrently=True)
+        op.drop_index("ix_articles_user_last_accessed", table_name="articles", postgresql_concurrently=True)
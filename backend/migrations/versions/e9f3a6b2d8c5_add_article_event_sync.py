@@ -0,0 +1,41 @@
+"""add_article_event_sync
+
+Revision ID: e9f3a6b2d8c5
+Revises: d5b1c8e2a7f4
+Create Date: 2024-09-23 15:12:30.905617
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e9f3a6b2d8c5"
+down_revision: Union[str, None] = "d5b1c8e2a7f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("articles", sa.Column("read_state_at", sa.DateTime(), nullable=True))
+    # Best known time of the current read state; unread articles never had one set
+    op.execute("UPDATE articles SET read_state_at = date_read WHERE date_read IS NOT NULL")
+
+    op.create_table(
+        "article_event_receipts",
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("event_id", sa.String(), nullable=False),
+        sa.Column("received_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "event_id"),
+    )
+    op.create_index(
+        op.f("ix_article_event_receipts_received_at"), "article_event_receipts", ["received_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_article_event_receipts_received_at"), table_name="article_event_receipts")
+    op.drop_table("article_event_receipts")
+    op.drop_column("articles", "read_state_at")
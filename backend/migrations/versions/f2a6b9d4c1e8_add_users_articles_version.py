@@ -0,0 +1,26 @@
+"""add_users_articles_version
+
+Revision ID: f2a6b9d4c1e8
+Revises: e3f8a1c5d2b7
+Create Date: 2024-09-05 16:48:03.512987
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2a6b9d4c1e8"
+down_revision: Union[str, None] = "e3f8a1c5d2b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("articles_version", sa.BigInteger(), server_default="0", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "articles_version")
@@ -0,0 +1,5 @@
+import os
+
+# Test clients used outside a `with` block run each request on a fresh event loop, and asyncpg
+# connections can't be shared across loops, so tests connect per checkout.
+os.environ.setdefault("DB_NULL_POOL", "true")
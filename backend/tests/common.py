@@ -1,3 +1,4 @@
 VALID_ARTICLE_URL = "https://www.economist.com/leaders/2023/08/16/test-article"
 ANOTHER_VALID_ARTICLE_URL = "https://www.economist.com/leaders/2023/09/16/another-test-article"
 INVALID_ARTICLE_URL = "https://www.unsupported-site.com/article"
+UNTRACKED_VALID_ARTICLE_URL = "https://www.economist.com/leaders/2023/10/16/untracked-test-article"
@@ -4,9 +4,15 @@ import pytest
 from dotenv import load_dotenv
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
-from app.db import Base, get_db
+from app.articles.cache import read_state_cache
+from app.articles.history import access_event_log
+from app.articles.readfilter import read_filter_cache
+from app.articles.stats import stats_cache
+from app.db import Base, SessionLocal, get_db
+from app.models import User
 from app.server import app
 
 # Load environment variables from .env file
@@ -22,17 +28,17 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 # Construct the DATABASE_URL
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
-# Create the database engine
+# Create the database engines
 engine = create_engine(DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(
+    DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1), poolclass=NullPool
+)
+TestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+async def override_get_db():
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -40,6 +46,21 @@ def setup_database():
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
+    read_state_cache.clear()
+    access_event_log.clear()
+    stats_cache.clear()
+    read_filter_cache.clear()
+
+
+@pytest.fixture(scope="function")
+def test_user():
+    db = SessionLocal()
+    user = User(id="test-uuid")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.close()
+    return user
 
 
 @pytest.fixture(scope="function")
@@ -1,28 +1,32 @@
+import asyncio
+import base64
+import csv
+import io
+import json
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import msgpack  # type: ignore[import-untyped]
 import pytest
 from fastapi.testclient import TestClient
 from freezegun import freeze_time
+from sqlalchemy import event, text
 from sqlalchemy.orm import Session
 
-from app.db import get_db
-from app.models import User
+from app.articles.api import ArticleResponse
+from app.articles.cache import read_state_cache
+from app.articles.encoding import from_columns
+from app.articles.route import ARTICLE_COLUMNS, _iter_export
+from app.config import Config
+from app.db import SessionLocal, async_engine
+from app.models import Article, User
 from app.server import app
 
-from .common import INVALID_ARTICLE_URL, VALID_ARTICLE_URL
+from .common import ANOTHER_VALID_ARTICLE_URL, INVALID_ARTICLE_URL, UNTRACKED_VALID_ARTICLE_URL, VALID_ARTICLE_URL
 
 client = TestClient(app)
 
 
-@pytest.fixture(scope="function")
-def test_user():
-    db: Session = next(get_db())
-    user = User(id="test-uuid")
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    db.close()
-    return user
-
-
 def test_access_article_no_creation(test_user):
     article_data = {
         "url": VALID_ARTICLE_URL,
@@ -43,6 +47,22 @@ def test_access_article_with_creation(test_user):
     assert not data["date_read"]
 
 
+def test_access_article_concurrent_creation(test_user):
+    article_data = {
+        "url": VALID_ARTICLE_URL,
+        "create_if_not_exist": True,
+    }
+
+    def access(_):
+        return client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(access, range(32)))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.json()["id"] for response in responses}) == 1
+
+
 def test_access_article_unsupported_site(test_user):
     article_data = {
         "url": INVALID_ARTICLE_URL,
@@ -52,6 +72,16 @@ def test_access_article_unsupported_site(test_user):
     assert response.json()["detail"] == "Unsupported website"
 
 
+def test_access_article_malformed_url(test_user):
+    response = client.post(
+        "/articles/access",
+        json={"url": "https://[::1/a", "create_if_not_exist": True},
+        headers={"User-Id": test_user.id},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unsupported website"
+
+
 def test_access_article_no_user_in_headers():
     article_data = {
         "url": VALID_ARTICLE_URL,
@@ -127,3 +157,555 @@ def test_mark_article_as_unread(test_user):
         assert data["date_first_accessed"] == "2024-08-21T10:00:00"
         assert data["date_last_accessed"] == "2024-08-21T11:00:00"
         assert not data["date_read"]
+
+
+def test_access_article_batch(test_user):
+    # Create one article up front so it can be touched without creation
+    client.post(
+        "/articles/access",
+        json={"url": ANOTHER_VALID_ARTICLE_URL, "create_if_not_exist": True},
+        headers={"User-Id": test_user.id},
+    )
+
+    batch_data = {
+        "items": [
+            {"url": VALID_ARTICLE_URL, "create_if_not_exist": True},
+            {"url": INVALID_ARTICLE_URL, "create_if_not_exist": True},
+            {"url": ANOTHER_VALID_ARTICLE_URL},
+            {"url": UNTRACKED_VALID_ARTICLE_URL},
+            {"url": VALID_ARTICLE_URL},
+        ]
+    }
+    response = client.post("/articles/access/batch", json=batch_data, headers={"User-Id": test_user.id})
+    assert response.status_code == 200
+    results = response.json()
+
+    assert [result["url"] for result in results] == [item["url"] for item in batch_data["items"]]
+    assert [result["status_code"] for result in results] == [200, 400, 200, 404, 200]
+    assert results[1]["detail"] == "Unsupported website"
+    assert results[3]["detail"] == "Article not found"
+    assert results[0]["article"]["id"] == results[4]["article"]["id"]
+
+    response = client.get("/articles/all", headers={"User-Id": test_user.id})
+    assert len(response.json()) == 2
+
+
+def test_access_article_batch_no_user_in_headers():
+    response = client.post("/articles/access/batch", json={"items": [{"url": VALID_ARTICLE_URL}]})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User ID is required"
+
+
+def test_lookup_articles(test_user):
+    with freeze_time("2024-08-21T10:00:00"):
+        response = client.post(
+            "/articles/access",
+            json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True},
+            headers={"User-Id": test_user.id},
+        )
+        article = response.json()
+        client.patch(f"/articles/{article['id']}/read", json={"read": True}, headers={"User-Id": test_user.id})
+        client.post(
+            "/articles/access",
+            json={"url": ANOTHER_VALID_ARTICLE_URL, "create_if_not_exist": True},
+            headers={"User-Id": test_user.id},
+        )
+
+    lookup_data = {"urls": [VALID_ARTICLE_URL, ANOTHER_VALID_ARTICLE_URL, UNTRACKED_VALID_ARTICLE_URL]}
+    response = client.post("/articles/lookup", json=lookup_data, headers={"User-Id": test_user.id})
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {VALID_ARTICLE_URL, ANOTHER_VALID_ARTICLE_URL}
+    assert data[VALID_ARTICLE_URL] == {"id": article["id"], "date_read": "2024-08-21T10:00:00"}
+    assert data[ANOTHER_VALID_ARTICLE_URL]["date_read"] is None
+
+
+def test_lookup_articles_too_many_urls(test_user):
+    lookup_data = {"urls": [f"{VALID_ARTICLE_URL}-{i}" for i in range(Config.Articles.LOOKUP_MAX_URLS + 1)]}
+    response = client.post("/articles/lookup", json=lookup_data, headers={"User-Id": test_user.id})
+    assert response.status_code == 422
+
+
+def test_get_articles_paginated(test_user):
+    urls = [f"{VALID_ARTICLE_URL}-{i}" for i in range(5)]
+    with freeze_time("2024-08-21T10:00:00") as frozen_time:
+        for url in urls:
+            client.post(
+                "/articles/access", json={"url": url, "create_if_not_exist": True}, headers={"User-Id": test_user.id}
+            )
+            frozen_time.tick(60)
+
+    pages = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = client.get("/articles/all", params=params, headers={"User-Id": test_user.id})
+        assert response.status_code == 200
+        pages.append([article["url"] for article in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert pages == [urls[4:2:-1], urls[2:0:-1], urls[0:1]]
+
+
+def test_get_articles_filtered(test_user):
+    with freeze_time("2024-08-21T10:00:00") as frozen_time:
+        response = client.post(
+            "/articles/access",
+            json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True},
+            headers={"User-Id": test_user.id},
+        )
+        read_article_id = response.json()["id"]
+        frozen_time.move_to("2024-08-22T10:00:00")
+        client.patch(f"/articles/{read_article_id}/read", json={"read": True}, headers={"User-Id": test_user.id})
+        client.post(
+            "/articles/access",
+            json={"url": ANOTHER_VALID_ARTICLE_URL, "create_if_not_exist": True},
+            headers={"User-Id": test_user.id},
+        )
+        client.post(
+            "/articles/access",
+            json={"url": "https://www.bbc.com/news/articles/c0000000", "create_if_not_exist": True},
+            headers={"User-Id": test_user.id},
+        )
+
+    def filtered_urls(**params):
+        response = client.get("/articles/all", params=params, headers={"User-Id": test_user.id})
+        assert response.status_code == 200
+        return {article["url"] for article in response.json()}
+
+    assert filtered_urls(read=True) == {VALID_ARTICLE_URL}
+    assert filtered_urls(read=False) == {ANOTHER_VALID_ARTICLE_URL, "https://www.bbc.com/news/articles/c0000000"}
+    assert filtered_urls(host="www.economist.com") == {VALID_ARTICLE_URL, ANOTHER_VALID_ARTICLE_URL}
+    assert filtered_urls(host="www.economist.com", read=False) == {ANOTHER_VALID_ARTICLE_URL}
+    assert filtered_urls(since="2024-08-22T00:00:00", until="2024-08-23T00:00:00") == {
+        VALID_ARTICLE_URL,
+        ANOTHER_VALID_ARTICLE_URL,
+        "https://www.bbc.com/news/articles/c0000000",
+    }
+    assert filtered_urls(until="2024-08-22T00:00:00") == set()
+
+
+def test_bulk_mark_read(test_user):
+    headers = {"User-Id": test_user.id}
+    bbc_url = "https://www.bbc.com/news/articles/c0000000"
+    with freeze_time("2024-08-21T10:00:00") as frozen_time:
+        ids = {}
+        for url in [VALID_ARTICLE_URL, ANOTHER_VALID_ARTICLE_URL, bbc_url]:
+            ids[url] = client.post(
+                "/articles/access", json={"url": url, "create_if_not_exist": True}, headers=headers
+            ).json()["id"]
+            frozen_time.tick(3600)
+
+        # By filter: only rows that change are reported
+        client.patch(f"/articles/{ids[VALID_ARTICLE_URL]}/read", json={"read": True}, headers=headers)
+        response = client.patch(
+            "/articles/read", json={"read": True, "filter": {"host": "www.economist.com"}}, headers=headers
+        )
+        assert response.status_code == 200
+        assert response.json() == {"updated": 1, "ids": [ids[ANOTHER_VALID_ARTICLE_URL]]}
+
+        response = client.patch(
+            "/articles/read",
+            json={"read": False, "filter": {"since": "2024-08-21T10:30:00", "until": "2024-08-21T13:00:00"}},
+            headers=headers,
+        )
+        assert response.json() == {"updated": 1, "ids": [ids[ANOTHER_VALID_ARTICLE_URL]]}
+
+        # By id, scoped to the user's own rows
+        response = client.patch(
+            "/articles/read",
+            json={"read": True, "ids": [ids[bbc_url], ids[VALID_ARTICLE_URL], 999999]},
+            headers=headers,
+        )
+        assert response.json() == {"updated": 1, "ids": [ids[bbc_url]]}
+
+    # Counters, caches and the last access order all agree
+    stats = client.get("/user/stats", headers=headers).json()
+    assert (stats["article_count"], stats["read_count"]) == (3, 2)
+    cached = client.get("/articles/", params={"url": bbc_url}, headers=headers).json()
+    assert cached[0]["date_read"] == "2024-08-21T13:00:00"
+    listed = client.get("/articles/all", headers=headers).json()
+    assert [article["url"] for article in listed] == [VALID_ARTICLE_URL, bbc_url, ANOTHER_VALID_ARTICLE_URL]
+
+
+def test_bulk_mark_read_requires_ids_or_filter(test_user):
+    for body in [{"read": True}, {"read": True, "ids": [1], "filter": {}}]:
+        response = client.patch("/articles/read", json=body, headers={"User-Id": test_user.id})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Exactly one of ids or filter is required"
+
+
+@pytest.mark.parametrize("article_id", [0, -(2**31) - 1, 99999999999])
+def test_mark_read_article_id_out_of_range(test_user, article_id):
+    response = client.patch(f"/articles/{article_id}/read", json={"read": True}, headers={"User-Id": test_user.id})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Article not found"
+
+
+@pytest.mark.parametrize("article_id", [0, 2**31])
+def test_bulk_mark_read_rejects_ids_out_of_range(test_user, article_id):
+    response = client.patch(
+        "/articles/read", json={"read": True, "ids": [1, article_id]}, headers={"User-Id": test_user.id}
+    )
+    assert response.status_code == 422
+
+
+def test_list_endpoints_keep_the_article_response_schema(test_user):
+    """The list endpoints encode selected columns directly; their output must be exactly what serializing
+    ArticleResponse models would produce."""
+    assert [column.key for column in ARTICLE_COLUMNS] == list(ArticleResponse.model_fields)
+
+    headers = {"User-Id": test_user.id}
+    with freeze_time("2024-08-21T10:00:00.123456") as frozen_time:
+        article_id = client.post(
+            "/articles/access", json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True}, headers=headers
+        ).json()["id"]
+        frozen_time.tick(1.5)
+        client.patch(f"/articles/{article_id}/read", json={"read": True}, headers=headers)
+        client.post(
+            "/articles/access", json={"url": ANOTHER_VALID_ARTICLE_URL, "create_if_not_exist": True}, headers=headers
+        )
+
+    with SessionLocal() as db:
+        expected = {
+            article.url: ArticleResponse.model_validate(article).model_dump(mode="json")
+            for article in db.query(Article).filter(Article.user_id == test_user.id)
+        }
+
+    listed = client.get("/articles/all", headers=headers).json()
+    assert listed == [expected[ANOTHER_VALID_ARTICLE_URL], expected[VALID_ARTICLE_URL]]
+
+    read_state_cache.clear()
+    for _ in range(2):  # from the database, then from the cache
+        by_url = client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers=headers).json()
+        assert by_url == [expected[VALID_ARTICLE_URL]]
+
+
+@pytest.mark.parametrize(
+    "cursor", ["not-a-cursor", base64.urlsafe_b64encode(b"2024-08-21T10:00:00|99999999999").decode()]
+)
+def test_get_articles_invalid_cursor(test_user, cursor):
+    response = client.get("/articles/all", params={"cursor": cursor}, headers={"User-Id": test_user.id})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_get_article_changes(test_user):
+    headers = {"User-Id": test_user.id}
+
+    def changes(**params):
+        response = client.get("/articles/changes", params=params, headers=headers)
+        assert response.status_code == 200
+        return response.json()
+
+    ids = [
+        client.post("/articles/access", json={"url": url, "create_if_not_exist": True}, headers=headers).json()["id"]
+        for url in [VALID_ARTICLE_URL, ANOTHER_VALID_ARTICLE_URL, UNTRACKED_VALID_ARTICLE_URL]
+    ]
+
+    # The first sync pages through everything
+    first_page = changes(limit=2)
+    assert [article["id"] for article in first_page["articles"]] == ids[:2]
+    assert first_page["has_more"]
+    second_page = changes(cursor=first_page["cursor"], limit=2)
+    assert [article["id"] for article in second_page["articles"]] == ids[2:]
+    assert not second_page["has_more"]
+
+    # Caught up
+    cursor = second_page["cursor"]
+    assert changes(cursor=cursor) == {"articles": [], "cursor": cursor, "has_more": False}
+
+    # Only what changed since
+    client.patch(f"/articles/{ids[0]}/read", json={"read": True}, headers=headers)
+    client.post("/articles/access", json={"url": ANOTHER_VALID_ARTICLE_URL}, headers=headers)
+    delta = changes(cursor=cursor)
+    assert [article["id"] for article in delta["articles"]] == [ids[0], ids[1]]
+    assert delta["articles"][0]["date_read"] is not None
+    assert changes(cursor=delta["cursor"])["articles"] == []
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        base64.urlsafe_b64encode(b"99999999999999999999|1").decode(),
+        base64.urlsafe_b64encode(b"1|99999999999").decode(),
+    ],
+)
+def test_get_article_changes_invalid_cursor(test_user, cursor):
+    response = client.get("/articles/changes", params={"cursor": cursor}, headers={"User-Id": test_user.id})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_export_articles(test_user):
+    with freeze_time("2024-08-21T10:00:00"):
+        client.post(
+            "/articles/access",
+            json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True},
+            headers={"User-Id": test_user.id},
+        )
+
+    response = client.get("/articles/export", headers={"User-Id": test_user.id})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 1
+    assert rows[0]["url"] == VALID_ARTICLE_URL
+    assert rows[0]["date_first_accessed"] == "2024-08-21T10:00:00"
+    assert rows[0]["date_read"] is None
+
+    response = client.get("/articles/export", params={"format": "csv"}, headers={"User-Id": test_user.id})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["url"] == VALID_ARTICLE_URL
+    assert rows[0]["date_last_accessed"] == "2024-08-21T10:00:00"
+    assert rows[0]["date_read"] == ""
+
+
+def test_list_endpoints_negotiate_compact_formats(test_user):
+    headers = {"User-Id": test_user.id}
+    with freeze_time("2024-08-21T10:00:00"):
+        for url in (VALID_ARTICLE_URL, ANOTHER_VALID_ARTICLE_URL):
+            client.post("/articles/access", json={"url": url, "create_if_not_exist": True}, headers=headers)
+
+    as_json = client.get("/articles/all", headers=headers)
+    as_columns = client.get("/articles/all", headers={**headers, "Accept": "application/vnd.articles.columnar+json"})
+    as_msgpack = client.get("/articles/all", headers={**headers, "Accept": "application/msgpack"})
+
+    assert as_columns.headers["content-type"] == "application/vnd.articles.columnar+json"
+    assert as_msgpack.headers["content-type"] == "application/msgpack"
+    assert all(response.headers["vary"] == "Accept" for response in (as_json, as_columns, as_msgpack))
+    assert len({as_json.headers["etag"], as_columns.headers["etag"], as_msgpack.headers["etag"]}) == 3
+
+    assert from_columns(as_columns.json()) == as_json.json()
+    decoded = from_columns(msgpack.unpackb(as_msgpack.content, timestamp=3))
+    assert [article["url"] for article in decoded] == [ANOTHER_VALID_ARTICLE_URL, VALID_ARTICLE_URL]
+    assert decoded[0]["date_first_accessed"].replace(tzinfo=None).isoformat() == "2024-08-21T10:00:00"
+
+    response = client.get(
+        "/articles/",
+        params={"url": VALID_ARTICLE_URL},
+        headers={**headers, "Accept": "application/msgpack", "If-None-Match": as_msgpack.headers["etag"]},
+    )
+    assert response.status_code == 200
+    assert from_columns(msgpack.unpackb(response.content))[0]["url"] == VALID_ARTICLE_URL
+
+
+def test_large_responses_are_gzipped(test_user):
+    db: Session = SessionLocal()
+    db.execute(
+        text(
+            "INSERT INTO articles (url, url_hash, user_id, date_first_accessed, date_last_accessed) "
+            "SELECT :prefix || g, g, :user_id, now(), now() FROM generate_series(1, 50) g"
+        ),
+        {"prefix": f"{VALID_ARTICLE_URL}-", "user_id": test_user.id},
+    )
+    db.commit()
+    db.close()
+
+    response = client.get("/articles/all", headers={"User-Id": test_user.id, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 50
+    gzip_etag = response.headers["ETag"]
+
+    response = client.get("/articles/all", headers={"User-Id": test_user.id, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    # Same version, different bytes: the compressed response's ETag is the weak form of the uncompressed one's
+    assert gzip_etag == f"W/{response.headers['ETag']}"
+
+    response = client.get(
+        "/articles/all", headers={"User-Id": test_user.id, "Accept-Encoding": "gzip", "If-None-Match": gzip_etag}
+    )
+    assert response.status_code == 304
+
+    response = client.get("/articles/all", params={"limit": 1}, headers={"User-Id": test_user.id})
+    assert "content-encoding" not in response.headers
+    assert not response.headers["ETag"].startswith("W/")
+
+
+def test_export_articles_msgpack(test_user):
+    with freeze_time("2024-08-21T10:00:00"):
+        client.post(
+            "/articles/access",
+            json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True},
+            headers={"User-Id": test_user.id},
+        )
+
+    response = client.get("/articles/export", headers={"User-Id": test_user.id, "Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    articles = [article for chunk in msgpack.Unpacker(io.BytesIO(response.content)) for article in from_columns(chunk)]
+    assert [article["url"] for article in articles] == [VALID_ARTICLE_URL]
+
+
+def test_export_articles_memory_is_bounded():
+    async def consume_export(user_id):
+        return sum([len(chunk) async for chunk in _iter_export(user_id, "ndjson")])
+
+    def seed_and_measure(user_id, count):
+        db: Session = SessionLocal()
+        db.add(User(id=user_id))
+        db.flush()
+        db.execute(
+            text(
+                "INSERT INTO articles (url, url_hash, user_id, date_first_accessed, date_last_accessed) "
+                "SELECT :prefix || g, g, :user_id, now(), now() FROM generate_series(1, :count) g"
+            ),
+            {"prefix": f"{VALID_ARTICLE_URL}-", "user_id": user_id, "count": count},
+        )
+        db.commit()
+        db.close()
+
+        tracemalloc.start()
+        try:
+            exported_bytes = asyncio.run(consume_export(user_id))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return exported_bytes, peak
+
+    small_bytes, small_peak = seed_and_measure("small-history", Config.Articles.EXPORT_CHUNK_SIZE)
+    large_bytes, large_peak = seed_and_measure("large-history", Config.Articles.EXPORT_CHUNK_SIZE * 20)
+
+    assert large_bytes > small_bytes * 15
+    assert large_peak < small_peak * 2
+
+
+def test_get_article_by_url_is_cached_and_written_through(test_user):
+    with freeze_time("2024-08-21T10:00:00") as frozen_time:
+        response = client.post(
+            "/articles/access",
+            json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True},
+            headers={"User-Id": test_user.id},
+        )
+        article = response.json()
+
+        hits_before = read_state_cache.hits
+        response = client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers={"User-Id": test_user.id})
+        assert response.status_code == 200
+        assert response.json() == [article]
+        assert read_state_cache.hits == hits_before + 1
+
+        frozen_time.move_to("2024-08-21T10:30:00")
+        client.patch(f"/articles/{article['id']}/read", json={"read": True}, headers={"User-Id": test_user.id})
+
+        response = client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers={"User-Id": test_user.id})
+        assert response.json()[0]["date_read"] == "2024-08-21T10:30:00"
+        assert read_state_cache.hits == hits_before + 2
+
+
+def test_get_articles_conditional_requests(test_user):
+    client.post(
+        "/articles/access",
+        json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True},
+        headers={"User-Id": test_user.id},
+    )
+
+    etags = {}
+    for path, params in (("/articles/all", {}), ("/articles/", {"url": VALID_ARTICLE_URL})):
+        # From the database: read state cache hits don't look up the version behind the ETag
+        read_state_cache.clear()
+        response = client.get(path, params=params, headers={"User-Id": test_user.id})
+        assert response.status_code == 200
+        etag = etags[path] = response.headers["ETag"]
+
+        response = client.get(path, params=params, headers={"User-Id": test_user.id, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert not response.content
+
+    all_etag = etags["/articles/all"]
+    assert all_etag != etags["/articles/"]
+
+    client.post("/articles/access", json={"url": VALID_ARTICLE_URL}, headers={"User-Id": test_user.id})
+
+    response = client.get("/articles/all", headers={"User-Id": test_user.id, "If-None-Match": all_etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != all_etag
+
+
+def test_get_article_by_url_cache_hits_skip_the_database(test_user):
+    headers = {"User-Id": test_user.id}
+    client.post("/articles/access", json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True}, headers=headers)
+    etag = client.get("/articles/all", headers=headers).headers["ETag"]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers=headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert response.json()[0]["url"] == VALID_ARTICLE_URL
+    assert "ETag" not in response.headers
+    assert statements == []
+
+    # Revalidating still checks the version
+    response = client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    response = client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_access_article_url_variants_share_one_row(test_user):
+    variants = [
+        VALID_ARTICLE_URL + "?utm_source=twitter",
+        VALID_ARTICLE_URL + "/#top",
+        VALID_ARTICLE_URL.replace("https://", "http://"),
+    ]
+    ids = set()
+    for url in variants:
+        response = client.post(
+            "/articles/access", json={"url": url, "create_if_not_exist": True}, headers={"User-Id": test_user.id}
+        )
+        assert response.status_code == 200
+        assert response.json()["url"] == VALID_ARTICLE_URL
+        ids.add(response.json()["id"])
+    assert len(ids) == 1
+
+    response = client.get("/articles/", params={"url": variants[0]}, headers={"User-Id": test_user.id})
+    assert [article["id"] for article in response.json()] == list(ids)
+
+    response = client.post("/articles/lookup", json={"urls": variants[1:]}, headers={"User-Id": test_user.id})
+    assert set(response.json()) == set(variants[1:])
+
+
+INVALID_PORT_ARTICLE_URL = VALID_ARTICLE_URL.replace("www.economist.com", "www.economist.com:99999")
+
+
+def test_access_article_with_invalid_port(test_user):
+    headers = {"User-Id": test_user.id}
+    response = client.post(
+        "/articles/access", json={"url": INVALID_PORT_ARTICLE_URL, "create_if_not_exist": True}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["url"] == VALID_ARTICLE_URL
+
+    response = client.post(
+        "/articles/access/batch", json={"items": [{"url": INVALID_PORT_ARTICLE_URL}]}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["status_code"] == 200
+
+
+def test_get_articles_with_invalid_port(test_user):
+    headers = {"User-Id": test_user.id}
+    article_id = client.post(
+        "/articles/access", json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True}, headers=headers
+    ).json()["id"]
+
+    response = client.get("/articles/", params={"url": INVALID_PORT_ARTICLE_URL}, headers=headers)
+    assert response.status_code == 200
+    assert [article["id"] for article in response.json()] == [article_id]
+
+    response = client.post("/articles/lookup", json={"urls": [INVALID_PORT_ARTICLE_URL]}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()[INVALID_PORT_ARTICLE_URL]["id"] == article_id
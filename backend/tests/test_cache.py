@@ -0,0 +1,71 @@
+from freezegun import freeze_time
+
+from app.articles.cache import LRUCacheBackend, ReadStateCache
+
+
+class FakeSharedBackend:
+    """Stands in for a store shared between workers, such as Redis."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl):
+        self.entries[key] = value
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def test_lru_backend_evicts_least_recently_used():
+    backend = LRUCacheBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    assert backend.get("a") == 1
+
+    backend.set("c", 3, ttl=60)
+    assert len(backend) == 2
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+
+
+def test_lru_backend_expires_entries():
+    with freeze_time("2024-08-21T10:00:00") as frozen_time:
+        backend = LRUCacheBackend(max_entries=10)
+        backend.set("a", 1, ttl=60)
+        frozen_time.tick(30)
+        assert backend.get("a") == 1
+        frozen_time.tick(31)
+        assert backend.get("a") is None
+
+
+def test_read_state_cache_counts_hits_and_misses():
+    cache = ReadStateCache(LRUCacheBackend(max_entries=10), ttl=60)
+    assert cache.get("user", "https://www.economist.com/a") is None
+    cache.set("user", "https://www.economist.com/a", [])
+    assert cache.get("user", "https://www.economist.com/a") == []
+    assert cache.get("other-user", "https://www.economist.com/a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_read_state_cache_shared_backend_keeps_workers_consistent():
+    shared_backend = FakeSharedBackend()
+    worker_a = ReadStateCache(LRUCacheBackend(max_entries=10), ttl=60)
+    worker_b = ReadStateCache(LRUCacheBackend(max_entries=10), ttl=60)
+    worker_a.set_backend(shared_backend)
+    worker_b.set_backend(shared_backend)
+
+    worker_a.set("user", "https://www.economist.com/a", [{"id": 1, "date_read": None}])
+    assert worker_b.get("user", "https://www.economist.com/a") == [{"id": 1, "date_read": None}]
+
+    worker_b.invalidate("user", "https://www.economist.com/a")
+    assert worker_a.get("user", "https://www.economist.com/a") is None
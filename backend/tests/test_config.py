@@ -0,0 +1,59 @@
+import pytest
+
+from app.config import Config
+
+
+@pytest.fixture
+def supported_sites(monkeypatch):
+    yield Config.SupportedSites
+    monkeypatch.undo()
+    Config.SupportedSites.load()
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://www.economist.com/business/2024/07/18/some-story",
+        "https://edition.cnn.com/2024/07/18/world/some-story",
+        "http://BBC.co.uk/news/some-story",
+        "https://news.google.com/articles/abc",
+    ],
+)
+def test_is_supported_accepts_sites_and_subdomains(url):
+    assert Config.SupportedSites.is_supported(url)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://evil.com/?cnn.com",
+        "https://evil.com/cnn.com/story",
+        "https://notbbc.com/news",
+        "https://cnn.com.evil.com/story",
+        "https://yahoo.com/news",
+        "not a url",
+        "https://[::1/a",
+    ],
+)
+def test_is_supported_rejects_lookalikes(url):
+    assert not Config.SupportedSites.is_supported(url)
+
+
+def test_load_extra_sites_from_env_and_file(supported_sites, monkeypatch, tmp_path):
+    sites_file = tmp_path / "sites.txt"
+    sites_file.write_text("# extra sites\nexample.org\n\n  Example.NET  # trailing comment\n")
+    monkeypatch.setenv(supported_sites.EXTRA_SITES_ENV, "apnews.com, theguardian.com")
+    monkeypatch.setenv(supported_sites.EXTRA_SITES_FILE_ENV, str(sites_file))
+    assert not supported_sites.is_supported("https://apnews.com/article/1")
+
+    supported_sites.load()
+
+    for url in [
+        "https://apnews.com/article/1",
+        "https://www.theguardian.com/world/1",
+        "https://example.org/1",
+        "https://blog.example.net/1",
+        "https://www.economist.com/1",
+    ]:
+        assert supported_sites.is_supported(url), url
+    assert not supported_sites.is_supported("https://example.com/1")
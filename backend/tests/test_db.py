@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import ASYNC_DATABASE_URL, POSTGRES_DB, InstrumentedQueuePool, async_engine, engine
+from app.server import app
+
+client = TestClient(app)
+
+
+def test_pool_stats_endpoint():
+    response = client.get("/health/pool")
+    assert response.status_code == 200
+    assert "pool" in response.json()
+
+
+def test_database_statement_timeout_applies_by_default():
+    async def show_statement_timeout():
+        async with async_engine.connect() as conn:
+            return await conn.scalar(text("SHOW statement_timeout"))
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f'ALTER DATABASE "{POSTGRES_DB}" SET statement_timeout = 12345'))
+        try:
+            assert asyncio.run(show_statement_timeout()) == "12345ms"
+        finally:
+            conn.execute(text(f'ALTER DATABASE "{POSTGRES_DB}" RESET statement_timeout'))
+
+
+def test_instrumented_pool_records_checkout_waits():
+    async def run():
+        engine = create_async_engine(
+            ASYNC_DATABASE_URL, poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.5
+        )
+
+        async def hold_connection():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT pg_sleep(0.2)"))
+
+        try:
+            await asyncio.gather(hold_connection(), hold_connection())
+            pool = engine.pool
+            assert isinstance(pool, InstrumentedQueuePool)
+            assert pool.checkouts == 2
+            assert pool.waiting == 0
+            assert pool.checkout_wait_seconds_max >= 0.1
+
+            async with engine.connect():
+                with pytest.raises(exc.TimeoutError):
+                    async with engine.connect():
+                        pass
+            assert pool.checkout_timeouts == 1
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_instrumented_pool_does_not_count_connecting_as_waiting():
+    async def run():
+        engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1)
+        # Every new connection takes a while to set up
+        event.listen(engine.sync_engine, "connect", lambda dbapi_connection, record: time.sleep(0.2))
+        try:
+            async with engine.connect(), engine.connect():
+                pass
+            pool = engine.pool
+            assert isinstance(pool, InstrumentedQueuePool)
+            assert pool.checkouts == 2
+            assert pool.checkout_wait_seconds_total == 0
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
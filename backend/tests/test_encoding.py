@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import msgpack  # type: ignore[import-untyped]
+import pytest
+
+from app.articles.encoding import (
+    COLUMNAR_JSON_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    encode_articles,
+    from_columns,
+    negotiate,
+    to_columns,
+)
+
+from .common import ANOTHER_VALID_ARTICLE_URL, VALID_ARTICLE_URL
+
+ARTICLES = [
+    {
+        "id": 1,
+        "url": VALID_ARTICLE_URL,
+        "date_first_accessed": datetime(2024, 8, 21, 10),
+        "date_last_accessed": datetime(2024, 8, 22, 10),
+        "date_read": None,
+    },
+    {
+        "id": 2,
+        "url": ANOTHER_VALID_ARTICLE_URL,
+        "date_first_accessed": datetime(2024, 8, 21, 11),
+        "date_last_accessed": datetime(2024, 8, 21, 11),
+        "date_read": datetime(2024, 8, 21, 11, 30),
+    },
+    {
+        "id": 3,
+        "url": "https://news.google.com/read?a=1",
+        "date_first_accessed": datetime(2024, 8, 23, 9),
+        "date_last_accessed": datetime(2024, 8, 23, 9),
+        "date_read": None,
+    },
+]
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, JSON_MEDIA_TYPE),
+        ("*/*", JSON_MEDIA_TYPE),
+        ("text/html", JSON_MEDIA_TYPE),
+        ("application/msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/x-msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/json;q=0.9, application/msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/msgpack;q=0.5, application/json", JSON_MEDIA_TYPE),
+        ("application/vnd.articles.columnar+json, */*;q=0.1", COLUMNAR_JSON_MEDIA_TYPE),
+        ("application/msgpack;q=0", JSON_MEDIA_TYPE),
+    ],
+)
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+def test_columns_dictionary_encode_url_prefixes():
+    columns = to_columns(ARTICLES)
+    assert columns["prefixes"] == ["https://www.economist.com/", "https://news.google.com/"]
+    assert columns["url_prefix"] == [0, 0, 1]
+    assert columns["url_suffix"][2] == "read?a=1"
+    assert columns["date_read"] == [None, datetime(2024, 8, 21, 11, 30), None]
+    assert from_columns(columns) == ARTICLES
+
+
+def test_msgpack_round_trips_dates_as_timestamps():
+    decoded = msgpack.unpackb(encode_articles(ARTICLES, MSGPACK_MEDIA_TYPE), timestamp=3)
+    articles = from_columns(decoded)
+    assert [article["url"] for article in articles] == [article["url"] for article in ARTICLES]
+    assert articles[1]["date_read"].replace(tzinfo=None) == datetime(2024, 8, 21, 11, 30)
+
+
+def test_compact_encodings_are_smaller():
+    articles = [{**ARTICLES[0], "id": index, "url": f"{VALID_ARTICLE_URL}-{index}"} for index in range(100)]
+    json_size = len(encode_articles(articles, JSON_MEDIA_TYPE))
+    assert len(encode_articles(articles, COLUMNAR_JSON_MEDIA_TYPE)) < json_size * 0.6
+    assert len(encode_articles(articles, MSGPACK_MEDIA_TYPE)) < json_size * 0.4
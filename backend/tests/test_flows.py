@@ -3,7 +3,7 @@ from fastapi.testclient import TestClient
 from freezegun import freeze_time
 from sqlalchemy.orm import Session
 
-from app.db import get_db
+from app.db import SessionLocal
 from app.server import app
 
 from .common import ANOTHER_VALID_ARTICLE_URL, VALID_ARTICLE_URL
@@ -13,7 +13,7 @@ client = TestClient(app)
 
 @pytest.fixture(scope="function")
 def db():
-    db = next(get_db())
+    db = SessionLocal()
     yield db
     db.close()
 
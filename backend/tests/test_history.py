@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from freezegun import freeze_time
+from sqlalchemy import func, select
+
+from app.articles.history import access_event_log
+from app.articles.rollup import rollup_access_events
+from app.db import AsyncSessionLocal, SessionLocal
+from app.models import ArticleAccessEvent
+from app.server import app
+
+from .common import ANOTHER_VALID_ARTICLE_URL, VALID_ARTICLE_URL
+
+client = TestClient(app)
+
+NEWS_URL = "https://news.google.com/articles/test-article"
+
+
+def access(user_id, url, when):
+    with freeze_time(when):
+        response = client.post(
+            "/articles/access", json={"url": url, "create_if_not_exist": True}, headers={"User-Id": user_id}
+        )
+    assert response.status_code == 200
+
+
+def flush_events():
+    return asyncio.run(access_event_log.flush(AsyncSessionLocal))
+
+
+def rollup(now, retention_days=90):
+    with SessionLocal() as db:
+        result = rollup_access_events(db, now=datetime.fromisoformat(now), retention_days=retention_days)
+        db.commit()
+    return result
+
+
+def activity(user_id, **params):
+    response = client.get("/articles/activity", params=params, headers={"User-Id": user_id})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_accesses_are_buffered_then_written_in_one_batch(test_user):
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-21T10:00:00")
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-21T11:00:00")
+    client.post(
+        "/articles/access/batch",
+        json={"items": [{"url": ANOTHER_VALID_ARTICLE_URL, "create_if_not_exist": True}]},
+        headers={"User-Id": test_user.id},
+    )
+    assert len(access_event_log) == 3
+
+    assert flush_events() == 3
+    assert len(access_event_log) == 0
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(ArticleAccessEvent)) == 3
+
+
+def test_rollup_buckets_visits_by_day_and_host(test_user):
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-20T09:00:00")
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-20T18:00:00")
+    access(test_user.id, NEWS_URL, "2024-08-20T19:00:00")
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-21T08:00:00")
+    flush_events()
+
+    result = rollup("2024-08-21T12:00:00")
+    assert (result.buckets, result.pruned) == (3, 0)
+
+    assert activity(test_user.id, since="2024-08-01") == [
+        {"day": "2024-08-20", "host": "news.google.com", "accesses": 1, "revisits": 0},
+        {"day": "2024-08-20", "host": "www.economist.com", "accesses": 2, "revisits": 1},
+        {"day": "2024-08-21", "host": "www.economist.com", "accesses": 1, "revisits": 1},
+    ]
+    assert activity(test_user.id, since="2024-08-21", until="2024-08-22") == [
+        {"day": "2024-08-21", "host": "www.economist.com", "accesses": 1, "revisits": 1},
+    ]
+
+
+def test_rollup_is_idempotent_and_picks_up_late_visits(test_user):
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-20T09:00:00")
+    flush_events()
+    rollup("2024-08-21T00:05:00")
+    rollup("2024-08-21T00:10:00")
+    assert [bucket["accesses"] for bucket in activity(test_user.id, since="2024-08-01")] == [1]
+
+    # Flushed after the last run, for a day that was already rolled up
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-20T23:59:00")
+    flush_events()
+    rollup("2024-08-21T01:00:00")
+    assert [bucket["accesses"] for bucket in activity(test_user.id, since="2024-08-01")] == [2]
+
+
+def test_rollup_prunes_only_rolled_up_visits_past_retention(test_user):
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-01T09:00:00")
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-20T09:00:00")
+    flush_events()
+
+    # The first run rolls everything up, so nothing can be pruned yet
+    assert rollup("2024-08-21T12:00:00", retention_days=7).pruned == 0
+    assert rollup("2024-08-21T12:00:00", retention_days=7).pruned == 1
+
+    # The rollups outlive the raw visits
+    assert [bucket["day"] for bucket in activity(test_user.id, since="2024-08-01")] == ["2024-08-01", "2024-08-20"]
+
+
+def test_rollup_adds_backlogs_for_days_already_rolled_up(test_user):
+    access(test_user.id, VALID_ARTICLE_URL, "2024-08-20T09:00:00")
+    flush_events()
+    rollup("2024-08-21T12:00:00")
+
+    # A week-old offline visit, replayed after that run
+    with freeze_time("2024-08-21T12:30:00"):
+        response = client.post(
+            "/articles/events",
+            json={
+                "events": [
+                    {
+                        "id": "e1",
+                        "type": "access",
+                        "url": NEWS_URL,
+                        "occurred_at": "2024-08-14T09:00:00Z",
+                        "create_if_not_exist": True,
+                    }
+                ]
+            },
+            headers={"User-Id": test_user.id},
+        )
+    assert response.json()[0]["status"] == "applied"
+    flush_events()
+
+    expected = [
+        {"day": "2024-08-14", "host": "news.google.com", "accesses": 1, "revisits": 0},
+        {"day": "2024-08-20", "host": "www.economist.com", "accesses": 1, "revisits": 0},
+    ]
+    # Counted once however often the rollup runs, and kept once the raw visit is pruned
+    assert rollup("2024-08-21T13:00:00", retention_days=3).pruned == 1
+    assert activity(test_user.id, since="2024-08-01") == expected
+    rollup("2024-08-21T14:00:00", retention_days=3)
+    assert activity(test_user.id, since="2024-08-01") == expected
+
+
+def test_activity_requires_user_id():
+    assert client.get("/articles/activity").status_code == 400
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import ASYNC_DATABASE_URL, InstrumentedQueuePool
+from app.metrics import UNMATCHED_ROUTE, RequestMetrics, _current_request, render_metrics
+from app.server import app
+
+from .common import VALID_ARTICLE_URL
+
+client = TestClient(app)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(__file__))
+READ_ROUTE = {"method": "PATCH", "route": "/articles/{article_id}/read"}
+
+
+def _value(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_are_recorded_per_route_template(test_user):
+    headers = {"User-Id": test_user.id}
+    article_id = client.post(
+        "/articles/access", json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True}, headers=headers
+    ).json()["id"]
+
+    requests = _value("http_request_duration_seconds_count", {**READ_ROUTE, "status": "200"})
+    queries = _value("http_request_db_queries_sum", READ_ROUTE)
+    db_time = _value("http_request_db_duration_seconds_sum", READ_ROUTE)
+    pool_waits = _value("http_request_db_pool_wait_seconds_count", READ_ROUTE)
+
+    client.patch(f"/articles/{article_id}/read", json={"read": True}, headers=headers)
+    client.patch(f"/articles/{article_id}/read", json={"read": False}, headers=headers)
+
+    assert _value("http_request_duration_seconds_count", {**READ_ROUTE, "status": "200"}) == requests + 2
+    # Version bump, the update, and the read counter, per request
+    assert _value("http_request_db_queries_sum", READ_ROUTE) == queries + 6
+    assert _value("http_request_db_duration_seconds_sum", READ_ROUTE) > db_time
+    assert _value("http_request_db_pool_wait_seconds_count", READ_ROUTE) == pool_waits + 2
+
+
+def test_pool_waits_are_recorded_for_the_request():
+    async def run():
+        engine = create_async_engine(
+            ASYNC_DATABASE_URL, poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=5
+        )
+
+        async def hold_connection():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT pg_sleep(0.2)"))
+
+        metrics = RequestMetrics()
+        token = _current_request.set(metrics)
+        try:
+            await asyncio.gather(hold_connection(), hold_connection())
+        finally:
+            _current_request.reset(token)
+            await engine.dispose()
+        return metrics
+
+    metrics = asyncio.run(run())
+    # One of the two waited for the other to check its connection back in
+    assert 0.1 <= metrics.pool_wait_seconds < 1
+
+
+def test_unmatched_paths_share_a_label():
+    labels = {"method": "GET", "route": UNMATCHED_ROUTE, "status": "404"}
+    before = _value("http_request_duration_seconds_count", labels)
+
+    client.get("/no/such/path")
+    client.get("/another/missing/path")
+
+    assert _value("http_request_duration_seconds_count", labels) == before + 2
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    client.get("/health")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    families = {family.name: family for family in text_string_to_metric_families(response.text)}
+    assert {
+        "http_request_duration_seconds",
+        "http_request_db_queries",
+        "http_request_db_duration_seconds",
+        "http_request_db_pool_wait_seconds",
+    } <= families.keys()
+    assert any(sample.labels.get("route") == "/health" for sample in families["http_request_duration_seconds"].samples)
+
+
+def test_metrics_are_merged_across_workers(tmp_path, monkeypatch):
+    record = "from app.metrics import REQUEST_QUERIES; REQUEST_QUERIES.labels('GET', '/health').observe(3)"
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        subprocess.run(
+            [sys.executable, "-c", record], env=env, check=True, cwd=os.path.dirname(os.path.dirname(__file__))
+        )
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    content, _ = render_metrics()
+    samples = {
+        sample.name: sample.value
+        for family in text_string_to_metric_families(content.decode())
+        for sample in family.samples
+        if sample.labels.get("route") == "/health" and not sample.labels.get("le")
+    }
+    assert samples["http_request_db_queries_count"] == pytest.approx(2)
+    assert samples["http_request_db_queries_sum"] == pytest.approx(6)
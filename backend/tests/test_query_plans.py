@@ -0,0 +1,170 @@
+"""Query plan checks for the hot endpoints.
+
+Every statement the requests below send is EXPLAINed, on the same connection and with the same parameters,
+against a seeded dataset large enough that Postgres picks an index wherever one applies. A sequential scan of
+articles or users, or a plan whose estimated cost or rows exceed the limits below, means a query lost its
+index (say, to a migration) or started reading more than it should.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app.articles.cache import read_state_cache
+from app.db import SessionLocal, async_engine
+from app.server import app
+
+from .common import ANOTHER_VALID_ARTICLE_URL, VALID_ARTICLE_URL
+
+client = TestClient(app)
+
+# Estimated total cost and rows of any one statement
+MAX_TOTAL_COST = 1000
+MAX_PLAN_ROWS = 1000
+SEQ_SCAN_FORBIDDEN = {"articles", "users"}
+
+SEED_USERS = 10_000
+# Users with SEED_ARTICLES_PER_USER articles each; the rest have none
+SEED_READERS = 50
+SEED_ARTICLES_PER_USER = 1000
+
+USER_ID = "user-1"
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+@dataclass
+class ExplainedStatement:
+    statement: str
+    plan: dict[str, Any]
+
+
+@contextmanager
+def explained_statements() -> Iterator[list[ExplainedStatement]]:
+    """Collect the plan of every statement the app sends to the database inside the block."""
+    explained: list[ExplainedStatement] = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return
+        if executemany:
+            parameters = parameters[0]
+        # A cursor of its own, so the statement's results aren't disturbed
+        explain_cursor = conn.connection.cursor()
+        explain_cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        (plan,) = explain_cursor.fetchone()
+        explained.append(ExplainedStatement(statement, plan[0]["Plan"]))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", explain)
+    try:
+        yield explained
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", explain)
+
+
+def _nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def plan_violations(plan: dict[str, Any]) -> list[str]:
+    violations = [
+        f"Seq Scan on {node['Relation Name']}"
+        for node in _nodes(plan)
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in SEQ_SCAN_FORBIDDEN
+    ]
+    if plan["Total Cost"] > MAX_TOTAL_COST:
+        violations.append(f"total cost {plan['Total Cost']} > {MAX_TOTAL_COST}")
+    if plan["Plan Rows"] > MAX_PLAN_ROWS:
+        violations.append(f"{plan['Plan Rows']} rows > {MAX_PLAN_ROWS}")
+    return violations
+
+
+@pytest.fixture(scope="function")
+def seeded_db():
+    with SessionLocal() as db:
+        db.execute(
+            text(
+                "INSERT INTO users (id, email) "
+                "SELECT 'user-' || g, 'user-' || g || '@example.com' FROM generate_series(1, :users) g"
+            ),
+            {"users": SEED_USERS},
+        )
+        db.execute(
+            text(
+                "INSERT INTO articles (url, url_hash, user_id, date_first_accessed, date_last_accessed, date_read, "
+                "read_state_at, change_version) "
+                "SELECT url, hashtextextended(url, 0), 'user-' || u, now() - a * interval '1 hour', "
+                "now() - a * interval '1 minute', read_at, read_at, a "
+                "FROM generate_series(1, :readers) u, generate_series(1, :articles) a, "
+                "LATERAL (SELECT 'https://www.economist.com/seed/' || u || '/' || a AS url, "
+                "CASE WHEN a % 3 = 0 THEN now() END AS read_at) seed"
+            ),
+            {"readers": SEED_READERS, "articles": SEED_ARTICLES_PER_USER},
+        )
+        db.execute(text("ANALYZE users"))
+        db.execute(text("ANALYZE articles"))
+        db.commit()
+
+
+def test_hot_queries_use_indexes(seeded_db):
+    headers = {"User-Id": USER_ID}
+    explained: dict[str, list[ExplainedStatement]] = {}
+
+    with explained_statements() as explained["POST /articles/access (create)"]:
+        article_id = client.post(
+            "/articles/access", json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True}, headers=headers
+        ).json()["id"]
+    with explained_statements() as explained["POST /articles/access"]:
+        client.post("/articles/access", json={"url": VALID_ARTICLE_URL}, headers=headers)
+    with explained_statements() as explained["POST /articles/access/batch"]:
+        client.post(
+            "/articles/access/batch",
+            json={
+                "items": [{"url": VALID_ARTICLE_URL}, {"url": ANOTHER_VALID_ARTICLE_URL, "create_if_not_exist": True}]
+            },
+            headers=headers,
+        )
+
+    read_state_cache.clear()
+    with explained_statements() as explained["GET /articles/?url="]:
+        client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers=headers)
+    with explained_statements() as explained["GET /articles/all"]:
+        cursor = client.get("/articles/all", headers=headers).headers["X-Next-Cursor"]
+        client.get("/articles/all", params={"cursor": cursor}, headers=headers)
+    with explained_statements() as explained["GET /articles/changes"]:
+        cursor = client.get("/articles/changes", headers=headers).json()["cursor"]
+        client.get("/articles/changes", params={"cursor": cursor}, headers=headers)
+    with explained_statements() as explained["POST /articles/lookup"]:
+        client.post("/articles/lookup", json={"urls": [VALID_ARTICLE_URL, ANOTHER_VALID_ARTICLE_URL]}, headers=headers)
+
+    with explained_statements() as explained["PATCH /articles/{id}/read"]:
+        client.patch(f"/articles/{article_id}/read", json={"read": True}, headers=headers)
+    with explained_statements() as explained["PATCH /articles/read"]:
+        client.patch("/articles/read", json={"ids": [article_id], "read": False}, headers=headers)
+
+    with explained_statements() as explained["POST /user/login"]:
+        client.post("/user/login", json={"email": "user-5@example.com"})
+    with explained_statements() as explained["GET /user/stats"]:
+        client.get("/user/stats", headers=headers)
+
+    violations = [
+        f"{endpoint}: {violation}\n    {statement.statement}"
+        for endpoint, statements in explained.items()
+        for statement in statements
+        for violation in plan_violations(statement.plan)
+    ]
+    assert not violations, "\n".join(violations)
+    assert all(explained.values()), [endpoint for endpoint, statements in explained.items() if not statements]
+
+
+def test_plan_violations_flag_unindexed_queries(seeded_db):
+    with SessionLocal() as db:
+        (plan,) = db.execute(text("EXPLAIN (FORMAT JSON) SELECT * FROM articles WHERE date_read IS NOT NULL")).scalar()
+
+    assert "Seq Scan on articles" in plan_violations(plan["Plan"])
+    assert any(violation.endswith(f"> {MAX_PLAN_ROWS}") for violation in plan_violations(plan["Plan"]))
@@ -0,0 +1,97 @@
+import random
+
+from fastapi.testclient import TestClient
+
+from app.articles import readfilter
+from app.articles.readfilter import BloomFilter
+from app.articles.urls import canonicalize_url, url_hash
+from app.server import app
+
+from .common import ANOTHER_VALID_ARTICLE_URL, UNTRACKED_VALID_ARTICLE_URL, VALID_ARTICLE_URL
+
+client = TestClient(app)
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    rng = random.Random(42)
+    keys = [rng.getrandbits(64) - (1 << 63) for _ in range(20_000)]
+    bloom = BloomFilter.for_capacity(10_000, 0.01)
+    for key in keys[:10_000]:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys[:10_000])
+    false_positives = sum(key in bloom for key in keys[10_000:])
+    assert false_positives < 10_000 * 0.02
+
+
+def fetch_filter(user_id, etag=None):
+    headers = {"User-Id": user_id}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get("/articles/read-filter", headers=headers)
+
+
+def as_bloom(response):
+    bloom = BloomFilter(int(response.headers["X-Bloom-Bits"]), int(response.headers["X-Bloom-Hashes"]))
+    bloom.array = bytearray(response.content)
+    return bloom
+
+
+def contains(bloom, url):
+    return url_hash(canonicalize_url(url)) in bloom
+
+
+def access_and_read(user_id, url, read=True):
+    headers = {"User-Id": user_id}
+    article_id = client.post(
+        "/articles/access", json={"url": url, "create_if_not_exist": True}, headers=headers
+    ).json()["id"]
+    client.patch(f"/articles/{article_id}/read", json={"read": read}, headers=headers)
+    return article_id
+
+
+def test_read_filter_is_versioned_and_caught_up_incrementally(test_user, monkeypatch):
+    access_and_read(test_user.id, VALID_ARTICLE_URL)
+    access_and_read(test_user.id, ANOTHER_VALID_ARTICLE_URL, read=False)
+
+    response = fetch_filter(test_user.id)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    bloom = as_bloom(response)
+    assert contains(bloom, VALID_ARTICLE_URL)
+    assert not contains(bloom, ANOTHER_VALID_ARTICLE_URL)
+
+    etag = response.headers["ETag"]
+    assert fetch_filter(test_user.id, etag).status_code == 304
+
+    # A new read is added to the cached filter rather than rebuilding it
+    builds = []
+    build = readfilter._build
+    monkeypatch.setattr(readfilter, "_build", lambda *args: builds.append(args) or build(*args))
+    access_and_read(test_user.id, UNTRACKED_VALID_ARTICLE_URL)
+
+    response = fetch_filter(test_user.id, etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert contains(as_bloom(response), UNTRACKED_VALID_ARTICLE_URL)
+    assert builds == []
+
+
+def test_read_filter_is_rebuilt_after_too_many_unreads(test_user, monkeypatch):
+    article_id = access_and_read(test_user.id, VALID_ARTICLE_URL)
+    assert contains(as_bloom(fetch_filter(test_user.id)), VALID_ARTICLE_URL)
+
+    # Within the budget an unread article lingers as a false positive
+    client.patch(f"/articles/{article_id}/read", json={"read": False}, headers={"User-Id": test_user.id})
+    monkeypatch.setattr(readfilter, "MAX_REMOVED_SHARE", 1.0)
+    assert contains(as_bloom(fetch_filter(test_user.id)), VALID_ARTICLE_URL)
+
+    client.patch(f"/articles/{article_id}/read", json={"read": True}, headers={"User-Id": test_user.id})
+    client.patch(f"/articles/{article_id}/read", json={"read": False}, headers={"User-Id": test_user.id})
+    monkeypatch.setattr(readfilter, "MAX_REMOVED_SHARE", 0.0)
+    assert not contains(as_bloom(fetch_filter(test_user.id)), VALID_ARTICLE_URL)
+
+
+def test_read_filter_errors():
+    assert client.get("/articles/read-filter").status_code == 400
+    assert fetch_filter("nobody").status_code == 404
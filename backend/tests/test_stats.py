@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from freezegun import freeze_time
+
+from app.articles.urls import url_hash
+from app.config import Config
+from app.db import SessionLocal
+from app.models import Article
+from app.server import app
+
+client = TestClient(app)
+
+
+def economist(n):
+    return f"https://www.economist.com/leaders/2024/08/{n:02d}/story"
+
+
+def seed(user_id, articles):
+    """articles: (url, first accessed, read at or None)"""
+    with SessionLocal() as db:
+        for url, first_accessed, read_at in articles:
+            first_accessed = datetime.fromisoformat(first_accessed)
+            db.add(
+                Article(
+                    user_id=user_id,
+                    url=url,
+                    url_hash=url_hash(url),
+                    date_first_accessed=first_accessed,
+                    date_last_accessed=first_accessed,
+                    date_read=datetime.fromisoformat(read_at) if read_at else None,
+                )
+            )
+        db.commit()
+
+
+def stats(user_id, **params):
+    response = client.get("/articles/stats", params=params, headers={"User-Id": user_id})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_article_stats(test_user):
+    seed(
+        test_user.id,
+        [
+            # A three day streak, then a two day one ending yesterday
+            (economist(1), "2024-08-01T09:00:00", "2024-08-01T10:00:00"),
+            (economist(2), "2024-08-02T09:00:00", "2024-08-02T09:30:00"),
+            (economist(3), "2024-08-02T11:00:00", "2024-08-02T12:00:00"),
+            (economist(4), "2024-08-03T09:00:00", "2024-08-03T13:00:00"),
+            (economist(5), "2024-08-19T09:00:00", "2024-08-19T11:00:00"),
+            (economist(6), "2024-08-20T09:00:00", "2024-08-20T10:00:00"),
+            ("https://edition.cnn.com/2024/08/20/world/story", "2024-08-20T08:00:00", None),
+            ("https://www.bbc.co.uk/news/story", "2024-08-10T08:00:00", "2024-08-20T08:00:00"),
+        ],
+    )
+
+    with freeze_time("2024-08-21T12:00:00"):
+        body = stats(test_user.id, days=7)
+
+    assert body["reads_per_day"] == [{"day": "2024-08-19", "reads": 1}, {"day": "2024-08-20", "reads": 2}]
+    # 2024-08-15 is a Thursday: the window is widened to whole weeks
+    assert body["reads_per_week"] == [{"week": "2024-08-19", "reads": 3}]
+    assert body["sites"] == [
+        {"site": "economist.com", "articles": 6, "read": 6},
+        {"site": "bbc.co.uk", "articles": 1, "read": 1},
+        {"site": "cnn.com", "articles": 1, "read": 0},
+    ]
+    assert (body["current_streak"], body["longest_streak"]) == (2, 3)
+    # 1h, 30m, 1h, 4h, 2h, 1h, 10 days
+    assert body["median_seconds_to_read"] == timedelta(hours=1).total_seconds()
+
+
+def test_article_stats_sites_are_the_most_specific_match(test_user, monkeypatch):
+    monkeypatch.setenv(Config.SupportedSites.EXTRA_SITES_ENV, "www.economist.com")
+    Config.SupportedSites.load()
+    try:
+        seed(
+            test_user.id,
+            [
+                (economist(1), "2024-08-01T09:00:00", "2024-08-01T10:00:00"),
+                ("https://www.economist.com:8443/a", "2024-08-01T09:00:00", None),
+                ("https://economist.com/b", "2024-08-01T09:00:00", None),
+                ("https://www.example.com/c", "2024-08-01T09:00:00", None),
+            ],
+        )
+        with freeze_time("2024-08-21T12:00:00"):
+            body = stats(test_user.id)
+    finally:
+        monkeypatch.undo()
+        Config.SupportedSites.load()
+
+    assert body["sites"] == [
+        {"site": "www.economist.com", "articles": 2, "read": 1},
+        {"site": "economist.com", "articles": 1, "read": 0},
+    ]
+
+
+def test_article_stats_streak_is_broken_after_a_missed_day(test_user):
+    seed(test_user.id, [(economist(1), "2024-08-01T09:00:00", "2024-08-01T10:00:00")])
+    with freeze_time("2024-08-03T12:00:00"):
+        body = stats(test_user.id)
+    assert (body["current_streak"], body["longest_streak"]) == (0, 1)
+
+
+def test_article_stats_without_articles(test_user):
+    assert stats(test_user.id) == {
+        "reads_per_day": [],
+        "reads_per_week": [],
+        "sites": [],
+        "current_streak": 0,
+        "longest_streak": 0,
+        "median_seconds_to_read": None,
+    }
+
+
+def test_article_stats_are_cached_until_the_next_write(test_user):
+    url = economist(1)
+    with freeze_time("2024-08-21T12:00:00"):
+        client.post(
+            "/articles/access", json={"url": url, "create_if_not_exist": True}, headers={"User-Id": test_user.id}
+        )
+        assert stats(test_user.id)["sites"] == [{"site": "economist.com", "articles": 1, "read": 0}]
+
+        # Written behind the API's back: the cached stats stand
+        seed(test_user.id, [(economist(2), "2024-08-21T09:00:00", None)])
+        assert stats(test_user.id)["sites"] == [{"site": "economist.com", "articles": 1, "read": 0}]
+
+        client.post("/articles/access", json={"url": url}, headers={"User-Id": test_user.id})
+        assert stats(test_user.id)["sites"] == [{"site": "economist.com", "articles": 2, "read": 0}]
+
+
+def test_article_stats_errors():
+    assert client.get("/articles/stats").status_code == 400
+    assert client.get("/articles/stats", headers={"User-Id": "nobody"}).status_code == 404
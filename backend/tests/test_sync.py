@@ -0,0 +1,151 @@
+from datetime import UTC, datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from freezegun import freeze_time
+
+from app.articles.sync import ArticleState, apply_event, to_utc
+from app.server import app
+
+from .common import ANOTHER_VALID_ARTICLE_URL, INVALID_ARTICLE_URL, VALID_ARTICLE_URL
+
+client = TestClient(app)
+
+
+def at(hour):
+    return datetime(2024, 8, 21, hour)
+
+
+def test_apply_event_read_state_is_last_writer_wins():
+    state = ArticleState(at(9), at(9), None, None)
+
+    assert apply_event(state, "read", at(12))
+    assert apply_event(state, "unread", at(14))
+    # Replayed late from an offline device: older than the unread, so it loses
+    assert not apply_event(state, "read", at(13))
+    assert (state.date_read, state.read_state_at) == (None, at(14))
+
+
+def test_apply_event_accesses_widen_the_access_range():
+    state = ArticleState(at(9), at(12), None, None)
+
+    assert apply_event(state, "access", at(8))
+    assert apply_event(state, "access", at(10))
+    assert (state.date_first_accessed, state.date_last_accessed) == (at(8), at(12))
+
+    assert apply_event(state, "read", at(15))
+    assert state.date_last_accessed == at(15)
+
+
+def test_to_utc_normalizes_and_clamps_client_timestamps():
+    now = datetime(2024, 8, 21, 12, tzinfo=UTC)
+    assert to_utc(datetime(2024, 8, 21, 10, tzinfo=timezone(timedelta(hours=2))), now) == at(8)
+    assert to_utc(at(11), now) == at(11)
+    assert to_utc(at(18), now) == at(12)
+
+
+def post_events(user_id, events):
+    with freeze_time("2024-08-21T20:00:00"):
+        response = client.post("/articles/events", json={"events": events}, headers={"User-Id": user_id})
+    assert response.status_code == 200
+    return response.json()
+
+
+def event(event_id, event_type, url, hour, **extra):
+    return {"id": event_id, "type": event_type, "url": url, "occurred_at": at(hour).isoformat(), **extra}
+
+
+def test_post_events_merges_a_backlog(test_user):
+    results = post_events(
+        test_user.id,
+        [
+            event("e1", "access", VALID_ARTICLE_URL, 9, create_if_not_exist=True),
+            event("e2", "unread", VALID_ARTICLE_URL, 14),
+            # Sent out of order: merged by timestamp, so the unread above is still the final state
+            event("e3", "read", VALID_ARTICLE_URL, 12),
+            event("e4", "access", ANOTHER_VALID_ARTICLE_URL, 10),
+            event("e5", "access", INVALID_ARTICLE_URL, 10, create_if_not_exist=True),
+            event("e1", "access", VALID_ARTICLE_URL, 9, create_if_not_exist=True),
+        ],
+    )
+
+    assert [result["status"] for result in results] == [
+        "applied",
+        "applied",
+        "applied",
+        "not_found",
+        "unsupported",
+        "duplicate",
+    ]
+    article = results[0]["article"]
+    assert article["date_first_accessed"] == "2024-08-21T09:00:00"
+    assert article["date_last_accessed"] == "2024-08-21T14:00:00"
+    assert article["date_read"] is None
+
+    stats = client.get("/user/stats", headers={"User-Id": test_user.id}).json()
+    assert stats == {"article_count": 1, "read_count": 0, "unread_count": 1}
+
+
+def test_post_events_replays_are_idempotent(test_user):
+    events = [
+        event("e1", "access", VALID_ARTICLE_URL, 9, create_if_not_exist=True),
+        event("e2", "read", VALID_ARTICLE_URL, 10),
+    ]
+    first = post_events(test_user.id, events)
+    assert [result["status"] for result in first] == ["applied", "applied"]
+
+    # A newer toggle from another device, then the first device retries its whole backlog
+    post_events(test_user.id, [event("e3", "unread", VALID_ARTICLE_URL, 11)])
+    replay = post_events(test_user.id, events)
+    assert [result["status"] for result in replay] == ["duplicate", "duplicate"]
+
+    article = client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers={"User-Id": test_user.id}).json()
+    assert article[0]["date_read"] is None
+
+
+def test_post_events_without_writes_keep_the_version(test_user):
+    headers = {"User-Id": test_user.id}
+    events = [
+        event("e1", "access", VALID_ARTICLE_URL, 9, create_if_not_exist=True),
+        event("e2", "access", ANOTHER_VALID_ARTICLE_URL, 10),
+        event("e3", "access", INVALID_ARTICLE_URL, 10, create_if_not_exist=True),
+    ]
+    post_events(test_user.id, events)
+    etag = client.get("/articles/all", headers=headers).headers["ETag"]
+
+    for batch in (events, [], [event("e4", "access", ANOTHER_VALID_ARTICLE_URL, 11)]):
+        post_events(test_user.id, batch)
+        response = client.get("/articles/all", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+    # The receipts were still kept
+    assert [result["status"] for result in post_events(test_user.id, events[1:] + [events[0]])] == [
+        "duplicate",
+        "duplicate",
+        "duplicate",
+    ]
+
+
+def test_post_events_loses_to_a_newer_server_side_toggle(test_user):
+    post_events(test_user.id, [event("e1", "access", VALID_ARTICLE_URL, 9, create_if_not_exist=True)])
+    article_id = client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers={"User-Id": test_user.id}).json()[
+        0
+    ]["id"]
+    with freeze_time("2024-08-21T15:00:00"):
+        client.patch(f"/articles/{article_id}/read", json={"read": True}, headers={"User-Id": test_user.id})
+
+    [result] = post_events(test_user.id, [event("e2", "unread", VALID_ARTICLE_URL, 13)])
+    assert result["status"] == "stale"
+    assert result["article"]["date_read"] == "2024-08-21T15:00:00"
+
+
+def test_post_events_requires_user(test_user):
+    response = client.post("/articles/events", json={"events": []})
+    assert response.status_code == 400
+    assert client.post("/articles/events", json={"events": []}, headers={"User-Id": "nobody"}).status_code == 404
+
+
+def test_post_events_with_invalid_port(test_user):
+    url = VALID_ARTICLE_URL.replace("www.economist.com", "www.economist.com:99999")
+    results = post_events(test_user.id, [event("a", "access", url, 9, create_if_not_exist=True)])
+    assert results[0]["status"] == "applied"
+    assert results[0]["article"]["url"] == VALID_ARTICLE_URL
@@ -0,0 +1,48 @@
+import pytest
+
+from app.articles.urls import canonicalize_url, url_hash
+
+from .common import VALID_ARTICLE_URL
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        VALID_ARTICLE_URL,
+        VALID_ARTICLE_URL + "/",
+        VALID_ARTICLE_URL + "#comments",
+        VALID_ARTICLE_URL + "?utm_source=newsletter&utm_medium=email",
+        VALID_ARTICLE_URL + "?fbclid=abc123",
+        VALID_ARTICLE_URL.replace("https://", "http://"),
+        VALID_ARTICLE_URL.replace("www.economist.com", "WWW.Economist.com:443"),
+    ],
+)
+def test_canonicalize_url_variants(url):
+    assert canonicalize_url(url) == VALID_ARTICLE_URL
+
+
+def test_canonicalize_url_keeps_meaningful_query_params_sorted():
+    assert canonicalize_url("https://news.google.com/read?b=2&utm_campaign=x&a=1") == (
+        "https://news.google.com/read?a=1&b=2"
+    )
+
+
+@pytest.mark.parametrize("port", ["99999", "http", "-1"])
+def test_canonicalize_url_drops_invalid_ports(port):
+    url = VALID_ARTICLE_URL.replace("www.economist.com", f"www.economist.com:{port}")
+    assert canonicalize_url(url) == VALID_ARTICLE_URL
+
+
+def test_canonicalize_url_returns_unparseable_urls_unchanged():
+    assert canonicalize_url(" https://[::1/a ") == "https://[::1/a"
+
+
+def test_canonicalize_url_keeps_root_path():
+    assert canonicalize_url("http://www.economist.com") == "https://www.economist.com/"
+
+
+def test_url_hash_is_signed_64_bit_and_stable():
+    value = url_hash(VALID_ARTICLE_URL)
+    assert -(2**63) <= value < 2**63
+    assert value == url_hash(VALID_ARTICLE_URL)
+    assert value != url_hash(VALID_ARTICLE_URL + "-2")
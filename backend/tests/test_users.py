@@ -1,6 +1,12 @@
 from fastapi.testclient import TestClient
+from sqlalchemy import update
 
+from app.db import SessionLocal
+from app.models import User
 from app.server import app
+from app.user.counters import reconcile_counters
+
+from .common import ANOTHER_VALID_ARTICLE_URL, VALID_ARTICLE_URL
 
 client = TestClient(app)
 
@@ -35,3 +41,106 @@ def test_login_existing_user():
     response = client.post("/user/login/", json={"email": "testloginuser@example.com"})
     assert response.status_code == 200
     assert response.json()["email"] == "testloginuser@example.com"
+
+
+def test_login_returns_counts_without_articles():
+    user_id = client.post("/user/register/", json={"email": "countsuser@example.com"}).json()["id"]
+    article_ids = [
+        client.post(
+            "/articles/access", json={"url": url, "create_if_not_exist": True}, headers={"User-Id": user_id}
+        ).json()["id"]
+        for url in [VALID_ARTICLE_URL, ANOTHER_VALID_ARTICLE_URL]
+    ]
+    client.patch(f"/articles/{article_ids[0]}/read", json={"read": True}, headers={"User-Id": user_id})
+
+    body = client.post("/user/login", json={"email": "countsuser@example.com"}).json()
+    assert body["article_count"] == 2
+    assert body["read_count"] == 1
+    assert body["articles"] is None
+
+
+def test_login_includes_capped_articles_on_request():
+    user_id = client.post("/user/register/", json={"email": "articlesuser@example.com"}).json()["id"]
+    for url in [VALID_ARTICLE_URL, ANOTHER_VALID_ARTICLE_URL]:
+        client.post("/articles/access", json={"url": url, "create_if_not_exist": True}, headers={"User-Id": user_id})
+
+    response = client.post(
+        "/user/login",
+        params={"include_articles": True, "articles_limit": 1},
+        json={"email": "articlesuser@example.com"},
+    )
+    assert response.status_code == 200
+    assert [article["url"] for article in response.json()["articles"]] == [ANOTHER_VALID_ARTICLE_URL]
+    assert response.json()["article_count"] == 2
+
+
+def test_register_with_existing_uuid():
+    user_id = client.post("/user/register/", json={}).json()["id"]
+    response = client.post("/user/register/", json={"uuid": user_id})
+    assert response.status_code == 400
+    assert "User with this id already exists" in response.json()["detail"]
+
+
+def _stats(user_id):
+    response = client.get("/user/stats", headers={"User-Id": user_id})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_user_stats_track_article_writes():
+    user_id = client.post("/user/register/", json={}).json()["id"]
+    assert _stats(user_id) == {"article_count": 0, "read_count": 0, "unread_count": 0}
+
+    headers = {"User-Id": user_id}
+    article_id = client.post(
+        "/articles/access", json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True}, headers=headers
+    ).json()["id"]
+    # Revisits and batches that only touch existing articles don't count twice
+    client.post("/articles/access", json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True}, headers=headers)
+    client.post(
+        "/articles/access/batch",
+        json={
+            "items": [
+                {"url": VALID_ARTICLE_URL, "create_if_not_exist": True},
+                {"url": ANOTHER_VALID_ARTICLE_URL, "create_if_not_exist": True},
+            ]
+        },
+        headers=headers,
+    )
+    assert _stats(user_id) == {"article_count": 2, "read_count": 0, "unread_count": 2}
+
+    client.patch(f"/articles/{article_id}/read", json={"read": True}, headers=headers)
+    client.patch(f"/articles/{article_id}/read", json={"read": True}, headers=headers)
+    assert _stats(user_id) == {"article_count": 2, "read_count": 1, "unread_count": 1}
+
+    client.patch(f"/articles/{article_id}/read", json={"read": False}, headers=headers)
+    assert _stats(user_id) == {"article_count": 2, "read_count": 0, "unread_count": 2}
+
+
+def test_user_stats_unknown_user():
+    assert client.get("/user/stats", headers={"User-Id": "nobody"}).status_code == 404
+    assert client.get("/user/stats").status_code == 400
+
+
+def test_reconcile_counters_reports_and_fixes_drift():
+    user_id = client.post("/user/register/", json={}).json()["id"]
+    client.post(
+        "/articles/access",
+        json={"url": VALID_ARTICLE_URL, "create_if_not_exist": True},
+        headers={"User-Id": user_id},
+    )
+
+    with SessionLocal() as db:
+        assert reconcile_counters(db) == []
+        db.execute(update(User).where(User.id == user_id).values(article_count=7, read_count=3))
+        db.commit()
+
+        [drift] = reconcile_counters(db)
+        assert (drift.user_id, drift.article_count, drift.actual_article_count) == (user_id, 7, 1)
+        assert (drift.read_count, drift.actual_read_count) == (3, 0)
+
+        assert len(reconcile_counters(db, fix=True)) == 1
+        db.commit()
+        assert reconcile_counters(db) == []
+
+    assert _stats(user_id) == {"article_count": 1, "read_count": 0, "unread_count": 1}
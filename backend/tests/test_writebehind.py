@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from freezegun import freeze_time
+
+from app import server
+from app.articles import route
+from app.articles.cache import read_state_cache
+from app.articles.writebehind import AccessCoalescer
+from app.db import AsyncSessionLocal, SessionLocal, async_engine
+from app.models import Article, User
+from app.server import app
+
+from .common import VALID_ARTICLE_URL
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="function")
+def coalescer(monkeypatch):
+    coalescer = AccessCoalescer(window_seconds=60)
+    monkeypatch.setattr(route, "access_coalescer", coalescer)
+    return coalescer
+
+
+def stored_article_and_version(user_id):
+    db = SessionLocal()
+    article = db.query(Article).filter(Article.user_id == user_id).one()
+    version = db.get(User, user_id).articles_version
+    db.close()
+    return article, version
+
+
+def test_repeat_accesses_are_coalesced_until_flushed(test_user, coalescer):
+    article_data = {"url": VALID_ARTICLE_URL, "create_if_not_exist": True}
+
+    with freeze_time("2024-08-21T10:00:00") as frozen_time:
+        response = client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+        assert response.status_code == 200
+        _, version = stored_article_and_version(test_user.id)
+
+        frozen_time.move_to("2024-08-21T10:00:20")
+        client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+        frozen_time.move_to("2024-08-21T10:00:30")
+        response = client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+        assert response.status_code == 200
+        assert response.json()["date_last_accessed"] == "2024-08-21T10:00:30"
+
+        article, pending_version = stored_article_and_version(test_user.id)
+        assert article.date_last_accessed.isoformat() == "2024-08-21T10:00:00"
+        assert pending_version == version
+
+        assert asyncio.run(coalescer.flush(AsyncSessionLocal)) == 1
+
+        article, flushed_version = stored_article_and_version(test_user.id)
+        assert article.date_last_accessed.isoformat() == "2024-08-21T10:00:30"
+        assert flushed_version == version + 1
+        assert article.change_version == flushed_version
+        assert asyncio.run(coalescer.flush(AsyncSessionLocal)) == 0
+
+
+def test_access_after_window_is_written_synchronously(test_user, coalescer):
+    article_data = {"url": VALID_ARTICLE_URL, "create_if_not_exist": True}
+
+    with freeze_time("2024-08-21T10:00:00") as frozen_time:
+        client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+
+        frozen_time.move_to("2024-08-21T10:01:00")
+        client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+
+        article, _ = stored_article_and_version(test_user.id)
+        assert article.date_last_accessed.isoformat() == "2024-08-21T10:01:00"
+
+
+def test_mark_read_ends_coalescing(test_user, coalescer):
+    article_data = {"url": VALID_ARTICLE_URL, "create_if_not_exist": True}
+
+    with freeze_time("2024-08-21T10:00:00") as frozen_time:
+        response = client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+        article_id = response.json()["id"]
+
+        frozen_time.move_to("2024-08-21T10:00:10")
+        client.patch(f"/articles/{article_id}/read", json={"read": True}, headers={"User-Id": test_user.id})
+
+        frozen_time.move_to("2024-08-21T10:00:20")
+        response = client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+        assert response.json()["date_read"] == "2024-08-21T10:00:10"
+
+        article, _ = stored_article_and_version(test_user.id)
+        assert article.date_last_accessed.isoformat() == "2024-08-21T10:00:20"
+
+
+def test_coalesced_accesses_keep_writes_from_other_workers(test_user, coalescer, monkeypatch):
+    article_data = {"url": VALID_ARTICLE_URL, "create_if_not_exist": True}
+
+    with freeze_time("2024-08-21T10:00:00") as frozen_time:
+        response = client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+        article_id = response.json()["id"]
+
+        # Marked read through another worker, whose coalescer is the one that forgets the article
+        with monkeypatch.context() as other_worker:
+            other_worker.setattr(coalescer, "forget", lambda user_id, url: None)
+            frozen_time.move_to("2024-08-21T10:00:10")
+            client.patch(f"/articles/{article_id}/read", json={"read": True}, headers={"User-Id": test_user.id})
+
+        frozen_time.move_to("2024-08-21T10:00:20")
+        response = client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+        assert response.json()["date_read"] == "2024-08-21T10:00:10"
+        assert response.json()["date_last_accessed"] == "2024-08-21T10:00:20"
+
+        # Without a cached copy to start from, the article is read back from the database
+        read_state_cache.clear()
+        frozen_time.move_to("2024-08-21T10:00:30")
+        response = client.post("/articles/access", json=article_data, headers={"User-Id": test_user.id})
+        assert response.json()["date_read"] == "2024-08-21T10:00:10"
+        assert response.json()["date_last_accessed"] == "2024-08-21T10:00:30"
+
+        cached = client.get("/articles/", params={"url": VALID_ARTICLE_URL}, headers={"User-Id": test_user.id})
+        assert cached.json()[0]["date_read"] == "2024-08-21T10:00:10"
+
+        article, _ = stored_article_and_version(test_user.id)
+        assert article.date_last_accessed.isoformat() == "2024-08-21T10:00:10"
+        assert asyncio.run(coalescer.flush(AsyncSessionLocal)) == 1
+        article, _ = stored_article_and_version(test_user.id)
+        assert article.date_last_accessed.isoformat() == "2024-08-21T10:00:30"
+
+
+def test_shutdown_goes_on_after_a_failed_flush(coalescer, monkeypatch):
+    monkeypatch.setattr(server, "access_coalescer", coalescer)
+
+    async def flush(session_factory):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(coalescer, "flush", flush)
+    pool = async_engine.sync_engine.pool
+    with TestClient(app):
+        pass
+    # Disposing the engine replaces its pool
+    assert async_engine.sync_engine.pool is not pool